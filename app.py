@@ -3,31 +3,88 @@ SPRA - Smart Production Resource Allocator
 Production-ready Flask Application with Authentication
 """
 import os
+import re
 import json
-from flask import Flask, render_template, request, jsonify, redirect, url_for
+import hashlib
+import time
+import queue
+import atexit
+import threading
+from collections import defaultdict
+from itertools import islice
+from flask import Flask, render_template, request, jsonify, redirect, url_for, abort, stream_with_context
+from flask.json.provider import JSONProvider
 from flask_cors import CORS
 from flask_login import LoginManager, login_required, login_user, logout_user, current_user
+from flask_limiter import Limiter
+from flask_limiter.util import get_remote_address
+from limits import RateLimitItemPerSecond
+from werkzeug.middleware.proxy_fix import ProxyFix
 from models import (
-    db, User, AuditLog, Component, HornType, HornTypeComponent,
-    Order, OrderLineItem, ProductionConfig, MRPPlan, InventoryTransaction
+    db, bulk_copy, User, AuditLog, AuditChangePayload, Component, HornType, HornTypeComponent,
+    Order, OrderLineItem, ProductionConfig, MRPPlan, InventoryTransaction, get_bom, utcnow,
+    evict_to_dict_cache
 )
 from datetime import datetime, timedelta
-from collections import defaultdict
+from sqlalchemy import func, case, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import noload, selectinload
 from functools import wraps
 import math
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 # Import config
 try:
-    from config import DEBUG, SECRET_KEY, DATABASE_URI, ENV
+    from config import (
+        DEBUG, SECRET_KEY, DATABASE_URI, ENV, AUDIT_LEVEL, AUDIT_SINK, AUDIT_FILE,
+        AUDIT_RETENTION_DAYS, AUDIT_FLUSH_INTERVAL, LOGIN_RATE_LIMIT, RATELIMIT_STORAGE_URI,
+        TRUSTED_PROXY_COUNT, SQLALCHEMY_ENGINE_OPTIONS
+    )
 except ImportError:
     ENV = os.environ.get('FLASK_ENV', 'development')
     DEBUG = ENV != 'production'
     SECRET_KEY = os.environ.get('SECRET_KEY', 'change-me-in-production')
     DATABASE_URI = os.environ.get('DATABASE_URL', 'sqlite:///data/spra.db')
+    AUDIT_LEVEL = os.environ.get('AUDIT_LEVEL', 'writes_only')
+    AUDIT_SINK = os.environ.get('AUDIT_SINK', 'db')
+    AUDIT_FILE = os.environ.get('AUDIT_FILE', 'data/audit.jsonl')
+    AUDIT_RETENTION_DAYS = int(os.environ.get('AUDIT_RETENTION_DAYS', 90))
+    AUDIT_FLUSH_INTERVAL = float(os.environ.get('AUDIT_FLUSH_INTERVAL', 5))
+    LOGIN_RATE_LIMIT = os.environ.get('LOGIN_RATE_LIMIT', '10/minute;100/hour')
+    RATELIMIT_STORAGE_URI = os.environ.get('RATELIMIT_STORAGE_URI', 'memory://')
+    TRUSTED_PROXY_COUNT = int(os.environ.get('TRUSTED_PROXY_COUNT', 0))
+    SQLALCHEMY_ENGINE_OPTIONS = {}
+
+
+class OrjsonProvider(JSONProvider):
+    """Serialize JSON with orjson, which is several times faster than stdlib json"""
+    option = orjson.OPT_NON_STR_KEYS if orjson else 0
+    
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=str, option=self.option).decode()
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+    
+    def response(self, *args, **kwargs):
+        # Hand orjson's bytes straight to the response, skipping the str round trip
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(
+            orjson.dumps(obj, default=str, option=self.option),
+            mimetype='application/json'
+        )
+
 
 app = Flask(__name__)
+if orjson is not None:
+    app.json = OrjsonProvider(app)
 app.config['SQLALCHEMY_DATABASE_URI'] = DATABASE_URI
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = SQLALCHEMY_ENGINE_OPTIONS
 app.config['SECRET_KEY'] = SECRET_KEY
 app.config['DEBUG'] = DEBUG
 
@@ -47,6 +104,15 @@ else:
 
 db.init_app(app)
 
+# Behind reverse proxies request.remote_addr is the proxy; take the client
+# address (and scheme) from the headers the trusted proxies add instead
+if TRUSTED_PROXY_COUNT:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=TRUSTED_PROXY_COUNT, x_proto=TRUSTED_PROXY_COUNT)
+
+# Rate limiting - only routes decorated with limiter.limit are throttled.
+# get_remote_address reads request.remote_addr, i.e. the ProxyFix-corrected client
+limiter = Limiter(get_remote_address, app=app, default_limits=[], storage_uri=RATELIMIT_STORAGE_URI)
+
 # ==================== AUTHENTICATION SETUP ====================
 
 login_manager = LoginManager()
@@ -57,7 +123,7 @@ login_manager.login_message_category = 'info'
 
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    return db.session.get(User, int(user_id))
 
 
 @app.before_request
@@ -68,76 +134,402 @@ def before_request():
     app.permanent_session_lifetime = timedelta(minutes=30)
 
 
-@app.after_request
-def set_security_headers(response):
-    """Add security headers to all responses"""
+# Security headers, built once at import and applied to every response
+_SECURITY_HEADERS = (
     # Prevent XSS attacks
-    response.headers['X-Content-Type-Options'] = 'nosniff'
-    response.headers['X-Frame-Options'] = 'SAMEORIGIN'
-    response.headers['X-XSS-Protection'] = '1; mode=block'
-    
+    ('X-Content-Type-Options', 'nosniff'),
+    ('X-Frame-Options', 'SAMEORIGIN'),
+    ('X-XSS-Protection', '1; mode=block'),
     # Content Security Policy - prevent inline scripts
-    response.headers['Content-Security-Policy'] = "default-src 'self'; script-src 'self' 'unsafe-inline' cdn.jsdelivr.net; style-src 'self' 'unsafe-inline' fonts.googleapis.com; font-src fonts.gstatic.com"
-    
-    # HTTPS only (in production)
-    if ENV == 'production':
-        response.headers['Strict-Transport-Security'] = 'max-age=31536000; includeSubDomains'
-    
+    ('Content-Security-Policy', "default-src 'self'; script-src 'self' 'unsafe-inline' cdn.jsdelivr.net; style-src 'self' 'unsafe-inline' fonts.googleapis.com; font-src fonts.gstatic.com"),
     # Referrer policy
-    response.headers['Referrer-Policy'] = 'strict-origin-when-cross-origin'
-    
+    ('Referrer-Policy', 'strict-origin-when-cross-origin'),
+)
+if ENV == 'production':
+    # HTTPS only (in production)
+    _SECURITY_HEADERS += (('Strict-Transport-Security', 'max-age=31536000; includeSubDomains'),)
+
+
+@app.after_request
+def set_security_headers(response):
+    """Add security headers to all responses"""
+    response.headers.update(_SECURITY_HEADERS)
+    return response
+
+
+# ==================== HTTP CACHING ====================
+
+def make_etag(*parts):
+    """Short ETag from the values that determine a response (timestamps, counts)"""
+    return hashlib.blake2b(':'.join(map(str, parts)).encode(), digest_size=8).hexdigest()
+
+
+def etag_response(etag, build):
+    """Return 304 if the client already has this ETag, otherwise jsonify(build())"""
+    if request.if_none_match.contains(etag):
+        response = app.response_class(status=304)
+    else:
+        response = jsonify(build())
+    response.set_etag(etag)
+    # Cacheable, but revalidate every time so edits show up immediately
+    response.headers['Cache-Control'] = 'private, no-cache'
     return response
 
 
+def stream_json_list(query, batch_size=500):
+    """Stream query results as a JSON array without building the whole list.
+    Rows are fetched with yield_per and sent in batches of batch_size.
+    
+    The first batch is fetched and serialized before the response starts, so
+    a failing query still becomes an ordinary 500. A failure after that is
+    logged and re-raised, which makes the server drop the connection before
+    the closing bracket: the client sees a broken response, never a shorter
+    but valid array.
+    """
+    dumps = app.json.dumps
+    rows = iter(query.yield_per(batch_size))
+    first_batch = [dumps(row.to_dict()) for row in islice(rows, batch_size)]
+    
+    def generate():
+        yield '[' + ','.join(first_batch)
+        try:
+            chunk = []
+            for row in rows:
+                chunk.append(dumps(row.to_dict()))
+                if len(chunk) >= batch_size:
+                    yield ',' + ','.join(chunk)
+                    chunk = []
+            if chunk:
+                yield ',' + ','.join(chunk)
+        except Exception:
+            app.logger.exception(f'Streaming {request.path} failed mid-response; aborting it')
+            raise
+        yield ']'
+    
+    return app.response_class(stream_with_context(generate()), mimetype='application/json')
+
+
 # ==================== AUDIT LOGGING ====================
 
-def add_audit_log(action, entity_type=None, entity_id=None, changes=None):
-    """Log user actions for audit trail"""
+# Audit rows are queued by request threads and written in batches by a
+# background thread, so logging never adds a commit to the request path.
+# A batch is written once it holds AUDIT_BUFFER_MAX rows or AUDIT_FLUSH_INTERVAL
+# (config) has passed since its first row, whichever comes first.
+AUDIT_BUFFER_MAX = 500  # Max rows per batch insert
+AUDIT_QUEUE_SIZE = 10000
+
+# Which audit categories each AUDIT_LEVEL records:
+#   read    - VIEW_* list/detail requests
+#   write   - CREATE_*/UPDATE_*/DELETE_*/GENERATE_* and user management
+#   auth    - successful login/logout
+#   failure - LOGIN_FAILED, UNAUTHORIZED_ACCESS
+AUDIT_LEVELS = {
+    'all': frozenset({'read', 'write', 'auth', 'failure'}),
+    'writes_only': frozenset({'write', 'auth', 'failure'}),
+    'mutations_only': frozenset({'write'}),
+    'failures_only': frozenset({'failure'}),
+}
+if AUDIT_LEVEL not in AUDIT_LEVELS:
+    app.logger.warning(f'Unknown AUDIT_LEVEL {AUDIT_LEVEL!r}, using writes_only')
+    AUDIT_LEVEL = 'writes_only'
+_AUDIT_CATEGORIES = AUDIT_LEVELS[AUDIT_LEVEL]
+
+audit_queue = queue.Queue(maxsize=AUDIT_QUEUE_SIZE)
+_audit_stop = object()  # Sentinel telling the writer to flush and exit
+_audit_writer = None
+_audit_writer_pid = None
+_audit_writer_lock = threading.Lock()
+
+
+# Identical 'changes' bodies (e.g. repeated LOGIN_FAILED reasons) are stored once
+# in audit_payloads; this maps sha256 -> payload id. Only the writer thread uses it.
+AUDIT_PAYLOAD_CACHE_MAX = 10000
+_audit_payload_ids = {}
+
+
+def _insert_audit_payloads(rows):
+    """Insert payload rows, skipping any another process already inserted"""
+    dialect = db.engine.dialect.name
+    if dialect == 'postgresql':
+        stmt = postgresql.insert(AuditChangePayload).on_conflict_do_nothing(index_elements=['sha256'])
+    elif dialect == 'sqlite':
+        stmt = sqlite.insert(AuditChangePayload).on_conflict_do_nothing(index_elements=['sha256'])
+    else:
+        stmt = AuditChangePayload.__table__.insert()
+    db.session.execute(stmt, rows)
+
+
+def _resolve_audit_payloads(batch):
+    """Replace each row's changes JSON with the id of its shared payload row"""
+    bodies = {}
+    for row in batch:
+        body = row.pop('changes')
+        if body is None:
+            row['changes_id'] = None
+            continue
+        digest = hashlib.sha256(body.encode()).hexdigest()
+        row['changes_id'] = digest  # Replaced with the payload id below
+        bodies[digest] = body
+    
+    if len(_audit_payload_ids) + len(bodies) > AUDIT_PAYLOAD_CACHE_MAX:
+        _audit_payload_ids.clear()
+    missing = [digest for digest in bodies if digest not in _audit_payload_ids]
+    if missing:
+        _insert_audit_payloads([{'sha256': digest, 'body': json.loads(bodies[digest])} for digest in missing])
+        _audit_payload_ids.update(
+            db.session.query(AuditChangePayload.sha256, AuditChangePayload.id)
+            .filter(AuditChangePayload.sha256.in_(missing))
+        )
+    
+    for row in batch:
+        if row['changes_id'] is not None:
+            row['changes_id'] = _audit_payload_ids[row['changes_id']]
+
+
+# File sink: one JSON object per line in one file per UTC day (audit.<date>.jsonl
+# next to AUDIT_FILE), shared by every worker process. Files are opened with
+# O_APPEND and each batch goes out in a single write, so concurrent workers never
+# interleave their lines and no rotation step is needed; files last written
+# more than AUDIT_RETENTION_DAYS ago are deleted when a new day's file is opened.
+AUDIT_PURGE_INTERVAL = 3600  # Seconds between retention purges of audit_logs
+AUDIT_PURGE_CHUNK = 10000  # Rows deleted per purge transaction
+_audit_file = {'day': None, 'fd': None}
+_last_audit_purge = None
+
+
+def _remove_expired_audit_files(directory, stem, suffix):
+    """Delete audit files last written more than AUDIT_RETENTION_DAYS ago.
+    Only names of the exact <stem>.<YYYY-MM-DD><suffix> form are touched."""
+    if not AUDIT_RETENTION_DAYS:
+        return
+    cutoff = time.time() - AUDIT_RETENTION_DAYS * 86400
+    pattern = re.compile(re.escape(stem) + r'\.\d{4}-\d{2}-\d{2}' + re.escape(suffix))
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if not (pattern.fullmatch(entry.name) and entry.is_file()):
+                continue
+            try:
+                if entry.stat().st_mtime < cutoff:
+                    os.remove(entry.path)
+            except OSError:
+                pass
+
+
+def _get_audit_file_fd():
+    """Return an append-only descriptor for today's audit file, switching
+    files (and applying retention) when the UTC date changes"""
+    day = datetime.utcnow().date()
+    if _audit_file['day'] != day:
+        directory = os.path.dirname(os.path.abspath(AUDIT_FILE))
+        stem, suffix = os.path.splitext(os.path.basename(AUDIT_FILE))
+        os.makedirs(directory, exist_ok=True)
+        fd = os.open(
+            os.path.join(directory, f'{stem}.{day.isoformat()}{suffix}'),
+            os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o640
+        )
+        if _audit_file['fd'] is not None:
+            os.close(_audit_file['fd'])
+        _audit_file.update(day=day, fd=fd)
+        _remove_expired_audit_files(directory, stem, suffix)
+    return _audit_file['fd']
+
+
+def _write_audit_file(batch):
+    """Append a batch of audit rows to the audit file"""
     try:
-        user_id = current_user.id if current_user.is_authenticated else None
+        data = ''.join(app.json.dumps(row) + '\n' for row in batch).encode()
+        fd = _get_audit_file_fd()
+        written = os.write(fd, data)
+        while written < len(data):  # only on a short write (e.g. disk nearly full)
+            written += os.write(fd, data[written:])
+    except Exception as e:
+        app.logger.error(f'Audit logging error ({len(batch)} rows dropped): {e}')
+
+
+def _purge_expired_audit_logs():
+    """Delete audit_logs rows older than AUDIT_RETENTION_DAYS, then payloads no
+    row references any more (at most once per interval).
+    
+    Runs in its own short transactions, AUDIT_PURGE_CHUNK rows at a time, so a
+    large backlog neither hits statement_timeout nor takes an audit batch down.
+    """
+    global _last_audit_purge
+    if not AUDIT_RETENTION_DAYS:
+        return
+    if _last_audit_purge is not None and time.monotonic() - _last_audit_purge < AUDIT_PURGE_INTERVAL:
+        return
+    _last_audit_purge = time.monotonic()
+    cutoff = datetime.utcnow() - timedelta(days=AUDIT_RETENTION_DAYS)
+    try:
+        while True:
+            expired = select(AuditLog.id).where(AuditLog.timestamp < cutoff).limit(AUDIT_PURGE_CHUNK)
+            deleted = AuditLog.query.filter(AuditLog.id.in_(expired)).delete(synchronize_session=False)
+            db.session.commit()
+            if deleted < AUDIT_PURGE_CHUNK:
+                break
         
-        log = AuditLog(
-            user_id=user_id,
-            action=action,
-            entity_type=entity_type,
-            entity_id=entity_id,
-            changes=json.dumps(changes) if changes else None,
-            ip_address=request.remote_addr,
-            user_agent=request.headers.get('User-Agent', '')[:500]
-        )
-        db.session.add(log)
+        referenced = select(AuditLog.id).where(AuditLog.changes_id == AuditChangePayload.id).exists()
+        AuditChangePayload.query.filter(~referenced).delete(synchronize_session=False)
         db.session.commit()
+        _audit_payload_ids.clear()
+    except Exception as e:
+        db.session.rollback()
+        app.logger.error(f'Audit retention purge failed: {e}')
+
+
+def _write_audit_batch(batch):
+    """Write a batch of audit rows to the configured sink"""
+    if AUDIT_SINK == 'file':
+        _write_audit_file(batch)
+        return
+    with app.app_context():
+        for attempt in range(2):
+            rows = [dict(row) for row in batch]
+            try:
+                _resolve_audit_payloads(rows)
+                bulk_copy(db.session, AuditLog, rows)
+                db.session.commit()
+                break
+            except Exception as e:
+                db.session.rollback()
+                # Cached payload ids may belong to rolled-back payload rows, or to
+                # payloads another worker's purge just removed: retry once uncached
+                _audit_payload_ids.clear()
+                if attempt:
+                    app.logger.error(f'Audit logging error ({len(batch)} rows dropped): {e}')
+        _purge_expired_audit_logs()
+
+
+def _audit_writer_loop():
+    """Drain the audit queue, flushing on batch size or interval"""
+    while True:
+        item = audit_queue.get()
+        if item is _audit_stop:
+            return
+        batch = [item]
+        deadline = time.monotonic() + AUDIT_FLUSH_INTERVAL
+        stopping = False
+        while len(batch) < AUDIT_BUFFER_MAX:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = audit_queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is _audit_stop:
+                stopping = True
+                break
+            batch.append(item)
+        _write_audit_batch(batch)
+        if stopping:
+            return
+
+
+def _ensure_audit_writer():
+    """Start the writer thread once per process (safe across gunicorn forks)"""
+    global _audit_writer, _audit_writer_pid
+    if _audit_writer is not None and _audit_writer_pid == os.getpid() and _audit_writer.is_alive():
+        return
+    with _audit_writer_lock:
+        if _audit_writer is not None and _audit_writer_pid == os.getpid() and _audit_writer.is_alive():
+            return
+        _audit_writer = threading.Thread(target=_audit_writer_loop, name='audit-writer', daemon=True)
+        _audit_writer_pid = os.getpid()
+        _audit_writer.start()
+
+
+@atexit.register
+def flush_audit_logs():
+    """Stop the writer and persist anything still queued"""
+    if _audit_writer is not None and _audit_writer_pid == os.getpid() and _audit_writer.is_alive():
+        try:
+            audit_queue.put(_audit_stop, timeout=1)
+            _audit_writer.join(timeout=AUDIT_FLUSH_INTERVAL + 5)
+        except queue.Full:
+            pass
+    batch = []
+    while True:
+        try:
+            item = audit_queue.get_nowait()
+        except queue.Empty:
+            break
+        if item is not _audit_stop:
+            batch.append(item)
+    if batch:
+        _write_audit_batch(batch)
+
+
+def add_audit_log(action, entity_type=None, entity_id=None, changes=None, category='write'):
+    """Queue a user action for the audit trail (skipped if AUDIT_LEVEL excludes its category)"""
+    if category not in _AUDIT_CATEGORIES:
+        return
+    try:
+        # Snapshot request state here - it is not available in the writer thread
+        user_id = current_user.id if current_user.is_authenticated else None
+        
+        log = {
+            'user_id': user_id,
+            'action': action,
+            'entity_type': entity_type,
+            'entity_id': entity_id,
+            'changes': json.dumps(changes, sort_keys=True, default=str) if changes else None,
+            'ip_address': request.remote_addr,
+            'user_agent': request.headers.get('User-Agent', '')[:500],
+            'timestamp': datetime.utcnow()
+        }
+        _ensure_audit_writer()
+        audit_queue.put_nowait(log)
+    except queue.Full:
+        app.logger.warning(f'Audit queue full, dropping {action} entry')
     except Exception as e:
         app.logger.error(f'Audit logging error: {e}')
 
 
 # ==================== ROLE-BASED ACCESS CONTROL ====================
 
-def admin_required(f):
-    """Decorator: Require admin role"""
-    @wraps(f)
-    def decorated_function(*args, **kwargs):
-        if not current_user.is_authenticated or not current_user.is_admin():
-            add_audit_log('UNAUTHORIZED_ACCESS', f.__name__)
-            return jsonify({'error': 'Admin access required'}), 403
-        return f(*args, **kwargs)
-    return login_required(decorated_function)
+_ADMIN_ROLES = frozenset({'admin'})
+_OPERATOR_ROLES = frozenset({'admin', 'operator'})
+
+
+def _role_required(roles, error):
+    """Build a decorator that checks login and role in a single wrapper"""
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            user = current_user
+            if not user.is_authenticated:
+                return login_manager.unauthorized()
+            if user.role not in roles:
+                add_audit_log('UNAUTHORIZED_ACCESS', f.__name__, category='failure')
+                return jsonify({'error': error}), 403
+            return f(*args, **kwargs)
+        return decorated_function
+    return decorator
+
 
+# Decorator: Require admin role
+admin_required = _role_required(_ADMIN_ROLES, 'Admin access required')
 
-def operator_required(f):
-    """Decorator: Require operator or admin role"""
-    @wraps(f)
-    def decorated_function(*args, **kwargs):
-        if not current_user.is_authenticated or not current_user.is_operator():
-            add_audit_log('UNAUTHORIZED_ACCESS', f.__name__)
-            return jsonify({'error': 'Operator access required'}), 403
-        return f(*args, **kwargs)
-    return login_required(decorated_function)
+# Decorator: Require operator or admin role
+operator_required = _role_required(_OPERATOR_ROLES, 'Operator access required')
 
 
 # ==================== AUTHENTICATION ROUTES ====================
 
+@app.errorhandler(429)
+def rate_limit_exceeded(e):
+    """Too many requests from this client"""
+    # Audit only the first rejection per client and limit window, so a flood
+    # of rejected requests doesn't turn into a flood of audit rows
+    once_per_window = RateLimitItemPerSecond(1, e.limit.limit.get_expiry())
+    if limiter.limiter.hit(once_per_window, 'audit-rate-limited', request.endpoint, get_remote_address()):
+        add_audit_log('RATE_LIMITED', request.endpoint, changes={'limit': str(e.description)}, category='failure')
+    return jsonify({'error': 'Too many attempts. Please try again later.'}), 429
+
+
 @app.route('/login', methods=['GET', 'POST'])
+@limiter.limit(LOGIN_RATE_LIMIT, methods=['POST'])
 def login():
     """User login"""
     if request.method == 'POST':
@@ -147,17 +539,19 @@ def login():
         
         # Validate input
         if not username or not password:
-            add_audit_log('LOGIN_FAILED', changes={'reason': 'Missing credentials'})
+            add_audit_log('LOGIN_FAILED', changes={'reason': 'Missing credentials'}, category='failure')
             return jsonify({'error': 'Username and password required'}), 400
         
         user = User.query.filter_by(username=username).first()
         
+        if not user:
+            User.check_dummy_password(password)
         if not user or not user.check_password(password):
-            add_audit_log('LOGIN_FAILED', changes={'username': username})
+            add_audit_log('LOGIN_FAILED', changes={'username': username}, category='failure')
             return jsonify({'error': 'Invalid username or password'}), 401
         
         if not user.is_active:
-            add_audit_log('LOGIN_FAILED', changes={'username': username, 'reason': 'Account disabled'})
+            add_audit_log('LOGIN_FAILED', changes={'username': username, 'reason': 'Account disabled'}, category='failure')
             return jsonify({'error': 'Account is disabled'}), 403
         
         # Login successful
@@ -175,7 +569,7 @@ def login():
         user.last_login = datetime.utcnow()
         db.session.commit()
         
-        add_audit_log('LOGIN_SUCCESS', changes={'username': username, 'remember': remember})
+        add_audit_log('LOGIN_SUCCESS', changes={'username': username, 'remember': remember}, category='auth')
         
         if request.is_json:
             return jsonify({'message': 'Login successful', 'user': user.to_dict()}), 200
@@ -188,7 +582,7 @@ def login():
 @login_required
 def logout():
     """User logout"""
-    add_audit_log('LOGOUT', changes={'username': current_user.username})
+    add_audit_log('LOGOUT', changes={'username': current_user.username}, category='auth')
     logout_user()
     return redirect(url_for('login'))
 
@@ -260,14 +654,24 @@ def index():
 
 # ==================== COMPONENT ROUTES ====================
 
+# Fields a client may change via PUT; anything else in the payload is ignored
+_COMPONENT_UPDATABLE = frozenset({
+    'code', 'name', 'description', 'unit', 'current_inventory', 'min_stock_level',
+    'max_stock_level', 'lead_time_days', 'supplier_name', 'supplier_contact',
+    'unit_cost', 'minimum_order_quantity'
+})
+
 
 @app.route('/api/components', methods=['GET'])
 @operator_required
 def get_components():
     """Get all components"""
-    components = Component.query.all()
-    add_audit_log('VIEW_COMPONENTS', 'Component', changes={'count': len(components)})
-    return jsonify([c.to_dict() for c in components])
+    last_updated, count = db.session.query(func.max(Component.updated_at), func.count(Component.id)).one()
+    add_audit_log('VIEW_COMPONENTS', 'Component', changes={'count': count}, category='read')
+    return etag_response(
+        make_etag('components', last_updated, count),
+        lambda: [c.to_dict() for c in Component.query.all()]
+    )
 
 
 @app.route('/api/components', methods=['POST'])
@@ -314,16 +718,16 @@ def update_component(component_id):
     data = request.json
     
     changes = {}
-    for key, value in data.items():
-        if hasattr(component, key) and key not in ['id', 'created_at', 'updated_at']:
-            old_value = getattr(component, key)
-            # Strip strings
-            if isinstance(value, str):
-                value = value.strip()
-            setattr(component, key, value)
-            changes[key] = {'old': old_value, 'new': value}
-    
-    component.updated_at = datetime.utcnow()
+    for key in _COMPONENT_UPDATABLE & data.keys():
+        value = data[key]
+        old_value = getattr(component, key)
+        # Strip strings
+        if isinstance(value, str):
+            value = value.strip()
+        setattr(component, key, value)
+        changes[key] = {'old': old_value, 'new': value}
+    
+    component.updated_at = utcnow()
     db.session.commit()
     
     add_audit_log('UPDATE_COMPONENT', 'Component', component.id, changes)
@@ -347,16 +751,38 @@ def delete_component(component_id):
 
 # ==================== HORN TYPE ROUTES ====================
 
+_HORN_TYPE_UPDATABLE = frozenset({'code', 'name', 'description'})
+
 @app.route('/api/horn-types', methods=['GET'])
 def get_horn_types():
     """Get all horn types with their BOM components"""
-    horn_types = HornType.query.all()
-    result = []
-    for ht in horn_types:
-        ht_dict = ht.to_dict()
-        ht_dict['bom_components'] = [b.to_dict() for b in ht.bom_components]
-        result.append(ht_dict)
-    return jsonify(result)
+    # BOM edits touch the horn type's updated_at; component edits change component names/units
+    stamp = db.session.query(
+        db.session.query(func.max(HornType.updated_at)).scalar_subquery(),
+        db.session.query(func.count(HornType.id)).scalar_subquery(),
+        db.session.query(func.max(Component.updated_at)).scalar_subquery(),
+        db.session.query(func.count(Component.id)).scalar_subquery()
+    ).one()
+    
+    def build():
+        horn_types = HornType.query.options(
+            selectinload(HornType.bom_components).selectinload(HornTypeComponent.component)
+        ).all()
+        result = []
+        for ht in horn_types:
+            ht_dict = ht.to_dict()
+            ht_dict['bom_components'] = [b.to_dict() for b in ht.bom_components]
+            result.append(ht_dict)
+        return result
+    
+    return etag_response(make_etag('horn-types', *stamp), build)
+
+
+def touch_horn_type(horn_type_id):
+    """Bump a horn type's updated_at after its BOM changes (invalidates ETags/caches)"""
+    HornType.query.filter_by(id=horn_type_id).update(
+        {'updated_at': utcnow()}, synchronize_session=False
+    )
 
 
 @app.route('/api/horn-types', methods=['POST'])
@@ -385,11 +811,10 @@ def update_horn_type(horn_type_id):
     horn_type = HornType.query.get_or_404(horn_type_id)
     data = request.json
     
-    for key, value in data.items():
-        if hasattr(horn_type, key) and key not in ['id', 'created_at', 'updated_at', 'bom_components']:
-            setattr(horn_type, key, value)
+    for key in _HORN_TYPE_UPDATABLE & data.keys():
+        setattr(horn_type, key, data[key])
     
-    horn_type.updated_at = datetime.utcnow()
+    horn_type.updated_at = utcnow()
     db.session.commit()
     
     return jsonify(horn_type.to_dict())
@@ -398,9 +823,21 @@ def update_horn_type(horn_type_id):
 @app.route('/api/horn-types/<int:horn_type_id>', methods=['DELETE'])
 def delete_horn_type(horn_type_id):
     """Delete a horn type"""
-    horn_type = HornType.query.get_or_404(horn_type_id)
-    db.session.delete(horn_type)
+    # Delete directly instead of loading the row first; children are removed
+    # explicitly since query deletes skip the ORM cascade
+    affected_orders = [
+        order_id for (order_id,) in
+        db.session.query(OrderLineItem.order_id).filter_by(horn_type_id=horn_type_id).distinct()
+    ]
+    HornTypeComponent.query.filter_by(horn_type_id=horn_type_id).delete(synchronize_session=False)
+    OrderLineItem.query.filter_by(horn_type_id=horn_type_id).delete(synchronize_session=False)
+    rows = HornType.query.filter_by(id=horn_type_id).delete(synchronize_session=False)
+    if not rows:
+        db.session.rollback()
+        abort(404)
+    recalculate_order_totals(affected_orders)
     db.session.commit()
+    evict_to_dict_cache(HornType.__tablename__, horn_type_id)
     
     return jsonify({'message': 'Horn type deleted successfully'})
 
@@ -433,6 +870,7 @@ def add_component_to_horn_type(horn_type_id):
     )
     
     db.session.add(bom_item)
+    touch_horn_type(horn_type_id)
     db.session.commit()
     
     return jsonify(bom_item.to_dict()), 201
@@ -448,6 +886,7 @@ def update_horn_type_component(horn_type_id, component_id):
     
     data = request.json
     bom_item.quantity_per_horn = float(data.get('quantity_per_horn', bom_item.quantity_per_horn))
+    touch_horn_type(horn_type_id)
     db.session.commit()
     
     return jsonify(bom_item.to_dict())
@@ -456,12 +895,14 @@ def update_horn_type_component(horn_type_id, component_id):
 @app.route('/api/horn-types/<int:horn_type_id>/components/<int:component_id>', methods=['DELETE'])
 def remove_component_from_horn_type(horn_type_id, component_id):
     """Remove a component from horn type BOM"""
-    bom_item = HornTypeComponent.query.filter_by(
+    rows = HornTypeComponent.query.filter_by(
         horn_type_id=horn_type_id,
         component_id=component_id
-    ).first_or_404()
+    ).delete(synchronize_session=False)
+    if not rows:
+        abort(404)
     
-    db.session.delete(bom_item)
+    touch_horn_type(horn_type_id)
     db.session.commit()
     
     return jsonify({'message': 'Component removed from horn type'})
@@ -472,8 +913,10 @@ def remove_component_from_horn_type(horn_type_id, component_id):
 @app.route('/api/orders', methods=['GET'])
 def get_orders():
     """Get all orders with line items"""
-    orders = Order.query.order_by(Order.created_at.desc()).all()
-    return jsonify([o.to_dict() for o in orders])
+    orders = Order.query.options(
+        selectinload(Order.line_items).selectinload(OrderLineItem.horn_type)
+    ).order_by(Order.created_at.desc())
+    return stream_json_list(orders)
 
 
 @app.route('/api/orders', methods=['POST'])
@@ -487,28 +930,28 @@ def create_order():
     
     deadline = datetime.fromisoformat(data['deadline'].replace('Z', '+00:00'))
     
+    line_items = [
+        {'horn_type_id': int(item['horn_type_id']), 'quantity': int(item['quantity'])}
+        for item in data.get('line_items', [])
+    ]
+    if not line_items:
+        return jsonify({'error': 'At least one horn type with quantity is required'}), 400
+    
     order = Order(
         order_number=order_number,
         customer_name=data['customer_name'],
         deadline=deadline,
         status=data.get('status', 'pending'),
-        notes=data.get('notes', '')
+        notes=data.get('notes', ''),
+        total_quantity=sum(item['quantity'] for item in line_items)
     )
     
     db.session.add(order)
     db.session.flush()
     
-    line_items = data.get('line_items', [])
-    if not line_items:
-        return jsonify({'error': 'At least one horn type with quantity is required'}), 400
-    
     for item in line_items:
-        line_item = OrderLineItem(
-            order_id=order.id,
-            horn_type_id=int(item['horn_type_id']),
-            quantity=int(item['quantity'])
-        )
-        db.session.add(line_item)
+        item['order_id'] = order.id
+    db.session.bulk_insert_mappings(OrderLineItem, line_items)
     
     db.session.commit()
     
@@ -534,17 +977,20 @@ def update_order(order_id):
                 changes[key] = {'old': str(old_value), 'new': str(value)}
     
     if 'line_items' in data:
+        line_items = [
+            {
+                'order_id': order_id,
+                'horn_type_id': int(item['horn_type_id']),
+                'quantity': int(item['quantity'])
+            }
+            for item in data['line_items']
+        ]
         OrderLineItem.query.filter_by(order_id=order_id).delete()
-        for item in data['line_items']:
-            line_item = OrderLineItem(
-                order_id=order_id,
-                horn_type_id=int(item['horn_type_id']),
-                quantity=int(item['quantity'])
-            )
-            db.session.add(line_item)
+        db.session.bulk_insert_mappings(OrderLineItem, line_items)
+        order.total_quantity = sum(item['quantity'] for item in line_items)
         changes['line_items'] = 'Updated'
     
-    order.updated_at = datetime.utcnow()
+    order.updated_at = utcnow()
     db.session.commit()
     
     add_audit_log('UPDATE_ORDER', 'Order', order_id, changes)
@@ -566,13 +1012,51 @@ def delete_order(order_id):
     return jsonify({'message': 'Order deleted successfully'})
 
 
+def recalculate_order_totals(order_ids):
+    """Recompute the stored total_quantity of orders from their line items"""
+    if not order_ids:
+        return
+    Order.query.filter(Order.id.in_(order_ids)).update(
+        {'total_quantity': Order.line_item_total.expression}, synchronize_session=False
+    )
+
+
 # ==================== PRODUCTION CONFIG ROUTES ====================
 
+# The single config row rarely changes, so keep a per-process copy of its dict.
+# Each read checks the row's (id, updated_at) first, so an update made through
+# another worker process takes effect on the next request.
+_PRODUCTION_CONFIG_UPDATABLE = frozenset({
+    'daily_production_capacity', 'working_days_per_week', 'max_inventory_days', 'safety_stock_days'
+})
+_production_config_cache = {'data': None, 'version': None}
+
+
+def get_cached_production_config():
+    """Return production config as a dict (None if not set), reloading it only
+    when the row's version stamp has changed"""
+    version = db.session.query(ProductionConfig.id, ProductionConfig.updated_at).first()
+    version = tuple(version) if version else None
+    if version is not None and version == _production_config_cache['version']:
+        return _production_config_cache['data']
+    config = ProductionConfig.query.first()
+    if config is None:
+        _production_config_cache.update(data=None, version=None)
+        return None
+    set_cached_production_config(config)
+    return _production_config_cache['data']
+
+
+def set_cached_production_config(config):
+    """Refresh the cache from a just-committed config row"""
+    _production_config_cache.update(data=config.to_dict(), version=(config.id, config.updated_at))
+
+
 @app.route('/api/production-config', methods=['GET'])
 def get_production_config():
     """Get production configuration"""
-    config = ProductionConfig.query.first()
-    if not config:
+    data = get_cached_production_config()
+    if data is None:
         config = ProductionConfig(
             daily_production_capacity=4000,
             working_days_per_week=6,
@@ -581,8 +1065,10 @@ def get_production_config():
         )
         db.session.add(config)
         db.session.commit()
+        set_cached_production_config(config)
+        data = config.to_dict()
     
-    return jsonify(config.to_dict())
+    return etag_response(make_etag('production-config', data['id'], data['updated_at']), lambda: data)
 
 
 @app.route('/api/production-config', methods=['PUT'])
@@ -594,12 +1080,12 @@ def update_production_config():
         db.session.add(config)
     
     data = request.json
-    for key, value in data.items():
-        if hasattr(config, key) and key not in ['id', 'updated_at']:
-            setattr(config, key, value)
+    for key in _PRODUCTION_CONFIG_UPDATABLE & data.keys():
+        setattr(config, key, data[key])
     
-    config.updated_at = datetime.utcnow()
+    config.updated_at = utcnow()
     db.session.commit()
+    set_cached_production_config(config)
     
     return jsonify(config.to_dict())
 
@@ -610,22 +1096,27 @@ def update_production_config():
 @operator_required
 def generate_mrp(order_id):
     """Generate MRP plan for an order"""
-    order = Order.query.get_or_404(order_id)
-    config = ProductionConfig.query.first()
+    # Only the order's own columns are needed; line items are aggregated below
+    order = Order.query.options(noload(Order.line_items)).filter_by(id=order_id).first_or_404()
+    config = get_cached_production_config()
     
     if not config:
         return jsonify({'error': 'Production configuration not set'}), 400
     
+    # Sum line item quantities per horn type in a single GROUP BY, then explode
+    # each horn type's BOM once. BOMs are cached per horn type version, so a
+    # repeat planning run needs no BOM query.
+    horn_type_quantities = (
+        db.session.query(HornType.id, HornType.updated_at, func.sum(OrderLineItem.quantity))
+        .join(OrderLineItem, OrderLineItem.horn_type_id == HornType.id)
+        .filter(OrderLineItem.order_id == order_id)
+        .group_by(HornType.id, HornType.updated_at)
+        .all()
+    )
     component_requirements = defaultdict(float)
-    
-    for line_item in order.line_items:
-        horn_type = line_item.horn_type
-        if not horn_type:
-            continue
-        for bom_item in horn_type.bom_components:
-            component_requirements[bom_item.component_id] += (
-                line_item.quantity * bom_item.quantity_per_horn
-            )
+    for horn_type_id, version, quantity in horn_type_quantities:
+        for component_id, quantity_per_horn in get_bom(horn_type_id, version):
+            component_requirements[component_id] += quantity * quantity_per_horn
     
     if not component_requirements:
         return jsonify({'error': 'Order has no horn types with components. Add components to horn types first.'}), 400
@@ -633,75 +1124,85 @@ def generate_mrp(order_id):
     component_ids = list(component_requirements.keys())
     components = Component.query.filter(Component.id.in_(component_ids)).all()
     
-    MRPPlan.query.filter_by(order_id=order_id).delete()
-    
-    order_date = order.order_date or datetime.utcnow()
+    now = datetime.utcnow()
+    order_date = order.order_date or now
     deadline = order.deadline
     total_quantity = order.total_quantity
     
-    working_days = calculate_working_days(order_date, deadline, config.working_days_per_week)
+    working_days = calculate_working_days(order_date, deadline, config['working_days_per_week'])
     
     if working_days <= 0:
         return jsonify({'error': 'Invalid deadline - not enough working days'}), 400
     
     daily_production = math.ceil(total_quantity / working_days)
     
-    if daily_production > config.daily_production_capacity:
+    if daily_production > config['daily_production_capacity']:
         return jsonify({
-            'warning': f'Required daily production ({daily_production}) exceeds capacity ({config.daily_production_capacity})',
-            'required_days': math.ceil(total_quantity / config.daily_production_capacity),
+            'warning': f'Required daily production ({daily_production}) exceeds capacity ({config["daily_production_capacity"]})',
+            'required_days': math.ceil(total_quantity / config['daily_production_capacity']),
             'available_days': working_days
         }), 400
     
-    production_start = order_date + timedelta(days=config.safety_stock_days)
+    safety_stock_days = config['safety_stock_days']
+    production_start = order_date + timedelta(days=safety_stock_days)
     mrp_plans = []
+    # Order/delivery dates depend only on lead time, which many components share
+    schedule_by_lead_time = {}
     
     for component in components:
+        current_inventory = component.current_inventory
+        minimum_order_quantity = component.minimum_order_quantity
+        lead_time_days = component.lead_time_days
+        
         total_required = component_requirements[component.id]
-        net_requirement = max(0, total_required - component.current_inventory)
+        net_requirement = max(0, total_required - current_inventory)
         
         if net_requirement > 0:
-            if component.minimum_order_quantity > 0:
-                order_quantity = math.ceil(net_requirement / component.minimum_order_quantity) * component.minimum_order_quantity
+            if minimum_order_quantity > 0:
+                order_quantity = math.ceil(net_requirement / minimum_order_quantity) * minimum_order_quantity
             else:
                 order_quantity = net_requirement
         else:
             order_quantity = 0
         
         if component.max_stock_level > 0:
-            max_order = component.max_stock_level - component.current_inventory
+            max_order = component.max_stock_level - current_inventory
             if order_quantity > max_order:
                 order_quantity = max_order
         
-        days_before_production = component.lead_time_days + config.safety_stock_days
-        order_date_calculated = production_start - timedelta(days=days_before_production)
+        schedule = schedule_by_lead_time.get(lead_time_days)
+        if schedule is None:
+            order_date_calculated = production_start - timedelta(days=lead_time_days + safety_stock_days)
+            if order_date_calculated < now:
+                order_date_calculated = now
+            expected_delivery = order_date_calculated + timedelta(days=lead_time_days)
+            schedule = schedule_by_lead_time[lead_time_days] = (order_date_calculated, expected_delivery)
+        order_date_calculated, expected_delivery = schedule
         
-        if order_date_calculated < datetime.utcnow():
-            order_date_calculated = datetime.utcnow()
-        
-        expected_delivery = order_date_calculated + timedelta(days=component.lead_time_days)
-        estimated_cost = order_quantity * component.unit_cost
-        
-        mrp_plan = MRPPlan(
-            order_id=order_id,
-            component_id=component.id,
-            total_required=total_required,
-            current_inventory=component.current_inventory,
-            net_requirement=net_requirement,
-            order_quantity=order_quantity,
-            order_date=order_date_calculated,
-            expected_delivery=expected_delivery,
-            estimated_cost=estimated_cost,
-            status='planned'
-        )
-        
-        db.session.add(mrp_plan)
-        mrp_plans.append(mrp_plan)
-    
+        mrp_plans.append({
+            'order_id': order_id,
+            'component_id': component.id,
+            'total_required': total_required,
+            'current_inventory': current_inventory,
+            'net_requirement': net_requirement,
+            'order_quantity': order_quantity,
+            'order_date': order_date_calculated,
+            'expected_delivery': expected_delivery,
+            'estimated_cost': order_quantity * component.unit_cost,
+            'status': 'planned'
+        })
+    
+    # Replace the previous plan in one transaction; plain-dict inserts skip the
+    # per-object unit-of-work bookkeeping, which dominates for large BOMs
+    MRPPlan.query.filter_by(order_id=order_id).delete()
+    db.session.bulk_insert_mappings(MRPPlan, mrp_plans)
     db.session.commit()
     
-    total_cost = sum(plan.estimated_cost for plan in mrp_plans)
-    components_to_order = sum(1 for plan in mrp_plans if plan.order_quantity > 0)
+    total_cost = sum(plan['estimated_cost'] for plan in mrp_plans)
+    components_to_order = sum(1 for plan in mrp_plans if plan['order_quantity'] > 0)
+    saved_plans = MRPPlan.query.options(selectinload(MRPPlan.component)).filter_by(order_id=order_id).all()
+    
+    add_audit_log('GENERATE_MRP', 'MRPPlan', None, {'order_id': order_id, 'total_cost': total_cost})
     
     return jsonify({
         'message': 'MRP plan generated successfully',
@@ -714,12 +1215,8 @@ def generate_mrp(order_id):
             'components_to_order': components_to_order,
             'total_estimated_cost': total_cost
         },
-        'plans': [plan.to_dict() for plan in mrp_plans]
+        'plans': [plan.to_dict() for plan in saved_plans]
     })
-    
-    add_audit_log('GENERATE_MRP', 'MRPPlan', None, {'order_id': order_id, 'total_cost': total_cost})
-    
-    return jsonify(response)
 
 
 @app.route('/api/mrp/order/<int:order_id>', methods=['GET'])
@@ -739,7 +1236,7 @@ def update_mrp_status(plan_id):
     plan.status = data.get('status', plan.status)
     
     if plan.status == 'received':
-        component = Component.query.get(plan.component_id)
+        component = db.session.get(Component, plan.component_id)
         if component:
             component.current_inventory += plan.order_quantity
             transaction = InventoryTransaction(
@@ -765,12 +1262,11 @@ def get_inventory_transactions():
     component_id = request.args.get('component_id', type=int)
     limit = request.args.get('limit', 100, type=int)
     
-    query = InventoryTransaction.query
+    query = InventoryTransaction.query.options(selectinload(InventoryTransaction.component))
     if component_id:
         query = query.filter_by(component_id=component_id)
     
-    transactions = query.order_by(InventoryTransaction.transaction_date.desc()).limit(limit).all()
-    return jsonify([t.to_dict() for t in transactions])
+    return stream_json_list(query.order_by(InventoryTransaction.transaction_date.desc()).limit(limit))
 
 
 @app.route('/api/inventory/adjust', methods=['POST'])
@@ -805,38 +1301,47 @@ def adjust_inventory():
 @app.route('/api/analytics/dashboard', methods=['GET'])
 def get_dashboard_analytics():
     """Get dashboard analytics"""
-    total_components = Component.query.count()
-    total_horn_types = HornType.query.count()
-    total_orders = Order.query.count()
-    active_orders = Order.query.filter(Order.status.in_(['pending', 'in_progress'])).count()
-    
-    low_stock_components = Component.query.filter(
-        Component.current_inventory < Component.min_stock_level
-    ).count()
-    
-    components = Component.query.all()
-    total_inventory_value = sum(c.current_inventory * c.unit_cost for c in components)
-    
-    return jsonify({
+    stamp = db.session.query(
+        db.session.query(func.max(Component.updated_at)).scalar_subquery(),
+        db.session.query(func.count(Component.id)).scalar_subquery(),
+        db.session.query(func.max(Order.updated_at)).scalar_subquery(),
+        db.session.query(func.count(Order.id)).scalar_subquery(),
+        db.session.query(func.count(HornType.id)).scalar_subquery()
+    ).one()
+    return etag_response(make_etag('analytics', *stamp), build_dashboard_analytics)
+
+
+def build_dashboard_analytics():
+    """Compute the dashboard analytics payload"""
+    # Two round-trips: component stats, then order stats with the horn type count
+    total_components, low_stock_components, total_inventory_value = db.session.query(
+        func.count(Component.id),
+        func.coalesce(func.sum(case((Component.current_inventory < Component.min_stock_level, 1), else_=0)), 0),
+        func.coalesce(func.sum(Component.current_inventory * Component.unit_cost), 0)
+    ).one()
+    
+    total_orders, active_orders, total_horn_types = db.session.query(
+        func.count(Order.id),
+        func.coalesce(func.sum(case((Order.status.in_(['pending', 'in_progress']), 1), else_=0)), 0),
+        db.session.query(func.count(HornType.id)).scalar_subquery()
+    ).one()
+    
+    return {
         'total_components': total_components,
         'total_horn_types': total_horn_types,
         'total_orders': total_orders,
         'active_orders': active_orders,
         'low_stock_components': low_stock_components,
         'total_inventory_value': total_inventory_value
-    })
+    }
 
 
 # ==================== HELPER FUNCTIONS ====================
 
 def calculate_working_days(start_date, end_date, working_days_per_week):
     """Calculate number of working days between two dates"""
-    total_days = (end_date - start_date).days
-    weeks = total_days // 7
-    remaining_days = total_days % 7
-    working_days = weeks * working_days_per_week
-    working_days += min(remaining_days, working_days_per_week)
-    return working_days
+    weeks, remaining_days = divmod((end_date - start_date).days, 7)
+    return weeks * working_days_per_week + min(remaining_days, working_days_per_week)
 
 
 # ==================== MAIN ====================
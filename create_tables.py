@@ -1,19 +1,230 @@
 """
 Production-safe: Create database tables only.
 Does NOT drop tables or add sample data. Safe to run on existing databases.
+On PostgreSQL, run it monthly (e.g. from cron) as well: it creates the upcoming
+monthly partitions and drops audit partitions past AUDIT_RETENTION_DAYS.
 """
 import os
+from datetime import date, datetime, timedelta
 
 # Set production mode for table creation
 os.environ.setdefault('FLASK_ENV', 'production')
 
-from app import app, db
+from app import app, db, AUDIT_RETENTION_DAYS
+from sqlalchemy import inspect, text
+from sqlalchemy.schema import AddConstraint
+
+# Columns added after their table was first released: (table, column, DDL, backfill SQL)
+ADDED_COLUMNS = [
+    ('orders', 'total_quantity', 'INTEGER NOT NULL DEFAULT 0',
+     "UPDATE orders SET total_quantity = "
+     "(SELECT COALESCE(SUM(quantity), 0) FROM order_line_items WHERE order_id = orders.id)"),
+    ('audit_logs', 'changes_id', 'INTEGER REFERENCES audit_payloads(id)', None),
+]
+
+# Text columns that became JSON documents, stored as JSONB on PostgreSQL: (table, column)
+JSONB_COLUMNS = [
+    ('audit_payloads', 'body'),
+    ('audit_logs', 'changes'),
+]
+
+# Append-only tables that PostgreSQL range-partitions by month: (table, partition column).
+# Time-range queries then only touch the matching months, and old audit months are
+# dropped whole instead of DELETEd row by row.
+PARTITIONED_TABLES = [
+    ('audit_logs', 'timestamp'),
+    ('inventory_transactions', 'transaction_date'),
+]
+PARTITION_MONTHS_AHEAD = 3  # Partitions created ahead of the current month
+
+def _disable_statement_timeout(conn):
+    """Lift the app's statement_timeout (config.py) for this migration
+    transaction: backfills, copies and index builds on big tables run longer"""
+    if conn.dialect.name == 'postgresql':
+        conn.execute(text("SET LOCAL statement_timeout = 0"))
+
+def add_missing_columns():
+    """Add columns introduced after a table was first created (create_all won't)"""
+    inspector = inspect(db.engine)
+    for table, column, ddl, backfill in ADDED_COLUMNS:
+        if column in {c['name'] for c in inspector.get_columns(table)}:
+            continue
+        print(f"Adding {table}.{column}...")
+        with db.engine.begin() as conn:
+            _disable_statement_timeout(conn)
+            conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+            if backfill:
+                conn.execute(text(backfill))
+
+def convert_json_columns():
+    """Switch JSON text columns to JSONB on PostgreSQL (other databases store JSON as text)"""
+    if db.engine.dialect.name != 'postgresql':
+        return
+    inspector = inspect(db.engine)
+    for table, column in JSONB_COLUMNS:
+        column_type = next(c['type'] for c in inspector.get_columns(table) if c['name'] == column)
+        if column_type.__visit_name__ == 'JSONB':
+            continue
+        print(f"Converting {table}.{column} to JSONB...")
+        with db.engine.begin() as conn:
+            _disable_statement_timeout(conn)
+            conn.execute(text(f"ALTER TABLE {table} ALTER COLUMN {column} TYPE JSONB USING {column}::jsonb"))
+
+def create_missing_indexes():
+    """Add indexes introduced after their table was created (create_all skips
+    existing tables). PostgreSQL builds them CONCURRENTLY so writes continue."""
+    is_postgresql = db.engine.dialect.name == 'postgresql'
+    partitioned = {table for table, _ in PARTITIONED_TABLES}
+    # CONCURRENTLY can't run inside a transaction
+    with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+        if is_postgresql:
+            # Each autocommit statement is its own transaction, so SET LOCAL won't
+            # do; a build cancelled by the app's timeout would leave an INVALID index
+            conn.execute(text("SET statement_timeout = 0"))
+            _drop_invalid_indexes(conn)
+        for table in db.metadata.sorted_tables:
+            for index in table.indexes:
+                if is_postgresql:
+                    # ...and isn't supported on partitioned tables
+                    index.dialect_options['postgresql']['concurrently'] = table.name not in partitioned
+                try:
+                    index.create(bind=conn, checkfirst=True)
+                except Exception as e:
+                    # e.g. duplicate rows blocking a unique index; fix the data, drop
+                    # any invalid index left behind, and re-run
+                    print(f"Warning: could not create index {index.name}: {e}")
+        if is_postgresql:
+            conn.execute(text("RESET statement_timeout"))
+
+def _drop_invalid_indexes(conn):
+    """Drop model indexes left INVALID by an interrupted CREATE INDEX CONCURRENTLY;
+    the existence check would otherwise skip rebuilding them forever"""
+    model_indexes = {index.name for table in db.metadata.sorted_tables for index in table.indexes}
+    invalid = conn.execute(text(
+        "SELECT index_class.relname FROM pg_index "
+        "JOIN pg_class index_class ON index_class.oid = pg_index.indexrelid "
+        "WHERE NOT pg_index.indisvalid"
+    )).scalars()
+    for name in invalid:
+        if name in model_indexes:
+            print(f"Dropping invalid index {name} to rebuild it...")
+            conn.execute(text(f'DROP INDEX CONCURRENTLY IF EXISTS "{name}"'))
+
+def _add_months(month, count):
+    """First day of the month count months after month"""
+    years, month_index = divmod(month.month - 1 + count, 12)
+    return date(month.year + years, month_index + 1, 1)
+
+def _create_month_partitions(conn, table, column, first_month, last_month):
+    """Create table_YYYY_MM partitions from first_month through last_month, plus
+    a default partition catching rows outside them"""
+    default = f"{table}_default"
+    conn.execute(text(f"CREATE TABLE IF NOT EXISTS {default} PARTITION OF {table} DEFAULT"))
+    month = first_month
+    while month <= last_month:
+        next_month = _add_months(month, 1)
+        partition = f"{table}_{month:%Y_%m}"
+        month_rows = f"\"{column}\" >= '{month}' AND \"{column}\" < '{next_month}'"
+        create = text(f"CREATE TABLE {partition} PARTITION OF {table} FOR VALUES FROM ('{month}') TO ('{next_month}')")
+        if conn.execute(text("SELECT to_regclass(:name)"), {'name': partition}).scalar() is None:
+            if conn.execute(text(f"SELECT EXISTS (SELECT 1 FROM {default} WHERE {month_rows})")).scalar():
+                # Rows for this month already sit in the default partition (a missed
+                # run, or future-dated rows), which blocks creating the month directly:
+                # detach the default, add the month, move its rows over, reattach
+                print(f"Moving {table} rows for {month:%Y-%m} out of the default partition...")
+                conn.execute(text(f"ALTER TABLE {table} DETACH PARTITION {default}"))
+                conn.execute(create)
+                conn.execute(text(f"INSERT INTO {table} SELECT * FROM {default} WHERE {month_rows}"))
+                conn.execute(text(f"DELETE FROM {default} WHERE {month_rows}"))
+                conn.execute(text(f"ALTER TABLE {table} ATTACH PARTITION {default} DEFAULT"))
+            else:
+                conn.execute(create)
+        month = next_month
+
+def _convert_to_partitioned(conn, table, column, last_month):
+    """Rebuild table as a monthly range-partitioned table, keeping its rows,
+    id sequence, foreign keys and indexes"""
+    legacy = f"{table}_legacy"
+    conn.execute(text(f"ALTER TABLE {table} RENAME TO {legacy}"))
+    sequence = conn.execute(text("SELECT pg_get_serial_sequence(:table, 'id')"), {'table': legacy}).scalar()
+    conn.execute(text(
+        f'CREATE TABLE {table} (LIKE {legacy} INCLUDING DEFAULTS) PARTITION BY RANGE ("{column}")'
+    ))
+    # The partition column becomes part of the primary key; make sure rows
+    # inserted without it (older databases lack the server default) still route
+    model_table = db.metadata.tables[table]
+    server_default = model_table.c[column].server_default
+    default_sql = server_default.arg.compile(dialect=conn.dialect) if server_default is not None else 'CURRENT_TIMESTAMP'
+    conn.execute(text(f'ALTER TABLE {table} ALTER COLUMN "{column}" SET DEFAULT {default_sql}'))
+    
+    # It joins the primary key below, so it can't be NULL; backfill legacy rows first
+    conn.execute(text(f'UPDATE {legacy} SET "{column}" = {default_sql} WHERE "{column}" IS NULL'))
+    conn.execute(text(f'ALTER TABLE {table} ALTER COLUMN "{column}" SET NOT NULL'))
+    
+    oldest = conn.execute(text(f'SELECT MIN("{column}") FROM {legacy}')).scalar()
+    first_month = (oldest.date() if oldest else date.today()).replace(day=1)
+    _create_month_partitions(conn, table, column, first_month, last_month)
+    conn.execute(text(f"INSERT INTO {table} SELECT * FROM {legacy}"))
+    
+    # The id sequence belongs to the old table; move it over before dropping that
+    if sequence:
+        conn.execute(text(f"ALTER SEQUENCE {sequence} OWNED BY {table}.id"))
+    conn.execute(text(f"DROP TABLE {legacy}"))
+    
+    # Unique keys on a partitioned table must include the partition column
+    conn.execute(text(f'ALTER TABLE {table} ADD PRIMARY KEY (id, "{column}")'))
+    for foreign_key in model_table.foreign_key_constraints:
+        conn.execute(AddConstraint(foreign_key))
+    for index in model_table.indexes:
+        index.dialect_options['postgresql']['concurrently'] = False
+        index.create(bind=conn)
+
+def _drop_expired_partitions(conn, table, cutoff):
+    """Drop monthly partitions of table whose whole month is older than cutoff"""
+    partitions = conn.execute(text(
+        "SELECT child.relname FROM pg_inherits "
+        "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+        "WHERE pg_inherits.inhparent = to_regclass(:table)"
+    ), {'table': table}).scalars()
+    for name in partitions:
+        try:
+            month = datetime.strptime(name[len(table) + 1:], '%Y_%m').date()
+        except ValueError:
+            continue  # The default partition
+        if _add_months(month, 1) <= cutoff:
+            print(f"Dropping expired partition {name}...")
+            conn.execute(text(f"DROP TABLE {name}"))
+
+def partition_tables():
+    """Range-partition the append-only tables by month and keep their partitions
+    current (PostgreSQL only; other databases keep plain tables)"""
+    if db.engine.dialect.name != 'postgresql':
+        return
+    last_month = _add_months(date.today().replace(day=1), PARTITION_MONTHS_AHEAD)
+    for table, column in PARTITIONED_TABLES:
+        # One transaction per table: a failed conversion leaves the table untouched
+        with db.engine.begin() as conn:
+            _disable_statement_timeout(conn)
+            relkind = conn.execute(
+                text("SELECT relkind FROM pg_class WHERE oid = to_regclass(:table)"), {'table': table}
+            ).scalar()
+            if relkind != 'p':
+                print(f"Partitioning {table} by month...")
+                _convert_to_partitioned(conn, table, column, last_month)
+            else:
+                _create_month_partitions(conn, table, column, date.today().replace(day=1), last_month)
+            if table == 'audit_logs' and AUDIT_RETENTION_DAYS:
+                _drop_expired_partitions(conn, table, date.today() - timedelta(days=AUDIT_RETENTION_DAYS))
 
 def create_tables():
     """Create all tables if they don't exist. Safe for production."""
     with app.app_context():
         print("Creating database tables (if not exist)...")
         db.create_all()
+        add_missing_columns()
+        convert_json_columns()
+        partition_tables()
+        create_missing_indexes()
         print("Tables ready.")
         # Ensure ProductionConfig has default if empty
         from models import ProductionConfig
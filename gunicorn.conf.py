@@ -0,0 +1,70 @@
+"""
+Gunicorn settings - loaded automatically when gunicorn starts in this directory.
+Every value can be overridden with the matching environment variable.
+"""
+import os
+import multiprocessing
+import threading
+from importlib.util import find_spec
+
+bind = f"{os.environ.get('HOST', '0.0.0.0')}:{os.environ.get('PORT', 5000)}"
+
+# Handlers are mostly database I/O, so run 2*CPU+1 processes to keep every core busy
+workers = int(os.environ.get('WORKERS', multiprocessing.cpu_count() * 2 + 1))
+
+# Requests spend most of their time waiting on the database, so gevent workers
+# (one greenlet per request) are the default when gevent is installed;
+# WORKER_CLASS=gthread uses THREADS threads per worker instead
+worker_class = os.environ.get('WORKER_CLASS', 'gevent' if find_spec('gevent') else 'gthread')
+threads = int(os.environ.get('THREADS', 4))  # gthread only; keep at or below DB_POOL_SIZE + DB_MAX_OVERFLOW
+worker_connections = int(os.environ.get('WORKER_CONNECTIONS', 1000))  # gevent only
+
+if worker_class == 'gevent':
+    # Patch before the app is preloaded, so its sockets and locks - and psycopg2,
+    # through psycogreen - yield to other greenlets instead of blocking the worker
+    from gevent import monkey
+    monkey.patch_all()
+    try:
+        from psycogreen.gevent import patch_psycopg
+        patch_psycopg()
+    except ImportError:
+        pass
+
+# Import the app once in the master and fork workers from it, so the loaded
+# code is shared copy-on-write instead of being imported again per worker
+preload_app = os.environ.get('PRELOAD_APP', 'true').lower() == 'true'
+
+# Recycle workers now and then (jittered so they don't all restart together)
+max_requests = int(os.environ.get('MAX_REQUESTS', 1000))
+max_requests_jitter = int(os.environ.get('MAX_REQUESTS_JITTER', 100))
+
+timeout = 120
+keepalive = 5
+
+
+def on_starting(server):
+    """Warn when login rate-limit counters would be split across workers"""
+    from config import RATELIMIT_STORAGE_URI
+    if workers > 1 and RATELIMIT_STORAGE_URI.startswith('memory://'):
+        server.log.warning(
+            "RATELIMIT_STORAGE_URI is memory:// with %d workers: each worker counts "
+            "login attempts separately and recycling resets them, so the effective "
+            "limit is about %d x LOGIN_RATE_LIMIT. Set RATELIMIT_STORAGE_URI=redis://...",
+            workers, workers)
+
+
+def pre_fork(server, worker):
+    """Let timers started while preloading the app (the rate limiter's in-memory
+    expiry timer) finish first; under gevent a forked worker would otherwise
+    resume the half-run greenlet and log a KeyError from threading"""
+    for thread in threading.enumerate():
+        if isinstance(thread, threading.Timer):
+            thread.join(timeout=1)
+
+
+def post_fork(server, worker):
+    """Drop database connections inherited from the master so each worker
+    opens its own instead of sharing the master's sockets"""
+    from app import app, db
+    with app.app_context():
+        db.engine.dispose(close=False)
@@ -1,13 +1,240 @@
+import io
+import json
+import os
+import sqlite3
+from functools import lru_cache
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
-from datetime import datetime
+from sqlalchemy import event, func, inspect, select
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import column_property
+from sqlalchemy.sql import expression
+
+try:
+    from argon2 import PasswordHasher
+    from argon2.exceptions import VerificationError, InvalidHashError
+except ImportError:
+    PasswordHasher = None
 
 db = SQLAlchemy()
 
+# JSON documents: binary, indexable JSONB on PostgreSQL, JSON text elsewhere
+JSONDocument = db.JSON().with_variant(JSONB(), 'postgresql')
+
+
+# ==================== TIMESTAMPS ====================
+
+class utcnow(expression.FunctionElement):
+    """Current UTC time from the database clock, as a naive timestamp like the
+    rest of the schema. Used as a SQL-side default, so INSERTs and UPDATEs
+    don't ship a Python-computed value for every row."""
+    type = db.DateTime()
+    inherit_cache = True
+
+
+@compiles(utcnow)
+def _utcnow_default(element, compiler, **kw):
+    return 'CURRENT_TIMESTAMP'
+
+
+@compiles(utcnow, 'postgresql')
+def _utcnow_postgresql(element, compiler, **kw):
+    # CURRENT_TIMESTAMP is frozen at transaction start; updated_at versions
+    # ETags and caches, so it must be the time of the statement itself
+    return "TIMEZONE('utc', STATEMENT_TIMESTAMP())"
+
+
+@compiles(utcnow, 'sqlite')
+def _utcnow_sqlite(element, compiler, **kw):
+    # CURRENT_TIMESTAMP has one-second resolution; updated_at versions caches
+    return "STRFTIME('%Y-%m-%d %H:%M:%f', 'now')"
+
+
+# ==================== SQLITE TUNING ====================
+
+# WAL lets readers run alongside a writer and, with synchronous=NORMAL, only
+# fsyncs at checkpoints instead of on every commit; mmap serves reads from the
+# page cache without read() calls
+SQLITE_PRAGMAS = (
+    'PRAGMA journal_mode=WAL',
+    'PRAGMA synchronous=NORMAL',
+    'PRAGMA mmap_size=268435456',  # 256 MB
+    'PRAGMA cache_size=-65536',  # 64 MB
+    'PRAGMA temp_store=MEMORY',
+)
+
+
+@event.listens_for(Engine, 'connect')
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """Apply SQLITE_PRAGMAS to every new SQLite connection"""
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    cursor = dbapi_connection.cursor()
+    for pragma in SQLITE_PRAGMAS:
+        cursor.execute(pragma)
+    cursor.close()
+
+
+# ==================== SERIALIZATION CACHE ====================
+
+# to_dict() results keyed on (table, id, updated_at): any ORM update bumps
+# updated_at, so a changed row simply gets a new entry
+TO_DICT_CACHE_MAX = 4096
+_to_dict_cache = {}
+
+
+def cached_to_dict(obj, build):
+    """Return a copy of build()'s dict for obj, reusing it while updated_at is unchanged"""
+    if obj.id is None or obj.updated_at is None or inspect(obj).modified:
+        return build()
+    key = (obj.__tablename__, obj.id, obj.updated_at)
+    cached = _to_dict_cache.get(key)
+    if cached is None:
+        if len(_to_dict_cache) >= TO_DICT_CACHE_MAX:
+            _to_dict_cache.clear()
+        cached = _to_dict_cache[key] = build()
+    return dict(cached)
+
+
+def evict_to_dict_cache(tablename, row_id):
+    """Drop cached dicts for a deleted row; call it after query-level deletes,
+    which skip the ORM's after_delete event"""
+    for key in list(_to_dict_cache):
+        if key[0] == tablename and key[1] == row_id:
+            _to_dict_cache.pop(key, None)
+
+
+def _evict_to_dict_cache(mapper, connection, target):
+    """after_delete hook: evict an ORM-deleted row"""
+    evict_to_dict_cache(target.__tablename__, target.id)
+
+
+class SerializerMixin:
+    """Generic column-to-dict serialization shared by the models.
+    
+    The column list is worked out once per class; to_dict() then only reads
+    attributes. Datetimes become ISO strings whichever JSON provider is active.
+    Columns named in serialize_exclude are left out.
+    """
+    serialize_exclude = ()
+    
+    @classmethod
+    @lru_cache(maxsize=None)
+    def _serialized_columns(cls):
+        """(attribute key, is_datetime) for every loaded, non-excluded column"""
+        return tuple(
+            (attr.key, isinstance(attr.columns[0].type, db.DateTime))
+            for attr in cls.__mapper__.column_attrs
+            if not attr.deferred and attr.key not in cls.serialize_exclude
+        )
+    
+    def column_dict(self):
+        result = {}
+        for key, is_datetime in self._serialized_columns():
+            value = getattr(self, key)
+            if is_datetime and value is not None:
+                value = value.isoformat()
+            result[key] = value
+        return result
+    
+    def to_dict(self):
+        return self.column_dict()
+
+# ==================== BULK LOAD ====================
+
+COPY_THRESHOLD = 100  # Smaller batches aren't worth switching to COPY
+
+
+def _copy_csv_field(value):
+    """Format a value for COPY ... (FORMAT csv): NULL is a bare empty field,
+    anything else is quoted so empty strings survive"""
+    if value is None:
+        return ''
+    if isinstance(value, (dict, list)):
+        value = json.dumps(value)  # JSON/JSONB columns; str() would give Python repr
+    return '"' + str(value).replace('"', '""') + '"'
+
+
+def _copy_supported(connection):
+    """COPY goes through psycopg2's copy_expert, which refuses to run while a
+    wait callback is installed. psycogreen sets one in gevent workers - the
+    default worker class - so there COPY is only used by scripts and
+    gthread/sync workers; lifting the callback is not an option since green
+    connections are left in libpq's non-blocking mode"""
+    if connection.dialect.name != 'postgresql' or connection.dialect.driver != 'psycopg2':
+        return False
+    from psycopg2.extensions import get_wait_callback
+    return get_wait_callback() is None
+
+
+def bulk_copy(session, model, rows):
+    """Append rows (dicts with the same keys, every value filled in - column
+    defaults are not applied) to model's table.
+    
+    On PostgreSQL (psycopg2, no gevent wait callback) batches of COPY_THRESHOLD
+    rows or more are streamed with COPY, which checks locks, permissions and
+    types once per statement rather than once per row; anything else goes
+    through bulk_insert_mappings, which SQLAlchemy still sends as multi-row
+    INSERTs.
+    """
+    if not rows:
+        return
+    connection = session.connection()
+    if len(rows) < COPY_THRESHOLD or not _copy_supported(connection):
+        session.bulk_insert_mappings(model, rows)
+        return
+    
+    columns = list(rows[0])
+    buf = io.StringIO()
+    for row in rows:
+        buf.write(','.join(_copy_csv_field(row[column]) for column in columns))
+        buf.write('\n')
+    buf.seek(0)
+    
+    preparer = connection.dialect.identifier_preparer
+    sql = 'COPY {} ({}) FROM STDIN WITH (FORMAT csv)'.format(
+        preparer.format_table(model.__table__),
+        ', '.join(preparer.quote(column) for column in columns)
+    )
+    cursor = connection.connection.cursor()
+    try:
+        cursor.copy_expert(sql, buf)
+    finally:
+        cursor.close()
+
 # ==================== AUTHENTICATION ====================
 
-class User(UserMixin, db.Model):
+# argon2id with OWASP's recommended 46 MiB / 2 passes; werkzeug's PBKDF2 is the
+# fallback when argon2-cffi isn't installed and still verifies older hashes
+_password_hasher = (
+    PasswordHasher(time_cost=2, memory_cost=46 * 1024, parallelism=1)
+    if PasswordHasher else None
+)
+
+
+def _hash_password(password):
+    """Hash a password with the preferred algorithm"""
+    if _password_hasher is not None:
+        return _password_hasher.hash(password)
+    return generate_password_hash(password)
+
+
+def _verify_password(password_hash, password):
+    """Check a password against an argon2 or werkzeug hash"""
+    if password_hash.startswith('$argon2'):
+        if _password_hasher is None:
+            return False
+        try:
+            return _password_hasher.verify(password_hash, password)
+        except (VerificationError, InvalidHashError):
+            return False
+    return check_password_hash(password_hash, password)
+
+
+class User(SerializerMixin, UserMixin, db.Model):
     """User account for SPRA access"""
     __tablename__ = 'users'
     
@@ -18,16 +245,35 @@ class User(UserMixin, db.Model):
     full_name = db.Column(db.String(120))
     role = db.Column(db.String(20), default='operator')  # admin, operator, viewer
     is_active = db.Column(db.Boolean, default=True)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=utcnow(), server_default=utcnow())
     last_login = db.Column(db.DateTime)
     
     def set_password(self, password):
         """Hash and set password"""
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = _hash_password(password)
     
     def check_password(self, password):
-        """Check password against hash"""
-        return check_password_hash(self.password_hash, password)
+        """Check password against hash, upgrading legacy or outdated hashes
+        to the current argon2 parameters (saved with the caller's next commit)"""
+        if not _verify_password(self.password_hash, password):
+            return False
+        if _password_hasher is not None and (
+            not self.password_hash.startswith('$argon2')
+            or _password_hasher.check_needs_rehash(self.password_hash)
+        ):
+            self.set_password(password)
+        return True
+    
+    _dummy_password_hash = None
+    
+    @classmethod
+    def check_dummy_password(cls, password):
+        """Spend the same hashing time as check_password when no user matched,
+        so response timing doesn't reveal which usernames exist"""
+        if cls._dummy_password_hash is None:
+            cls._dummy_password_hash = _hash_password(os.urandom(16).hex())
+        _verify_password(cls._dummy_password_hash, password)
+        return False
     
     def is_admin(self):
         return self.role == 'admin'
@@ -35,20 +281,10 @@ class User(UserMixin, db.Model):
     def is_operator(self):
         return self.role in ('admin', 'operator')
     
-    def to_dict(self):
-        return {
-            'id': self.id,
-            'username': self.username,
-            'email': self.email,
-            'full_name': self.full_name,
-            'role': self.role,
-            'is_active': self.is_active,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'last_login': self.last_login.isoformat() if self.last_login else None
-        }
-
-
-class AuditLog(db.Model):
+    serialize_exclude = ('password_hash',)
+
+
+class AuditLog(SerializerMixin, db.Model):
     """Tracks all user actions for compliance and debugging"""
     __tablename__ = 'audit_logs'
     
@@ -57,29 +293,44 @@ class AuditLog(db.Model):
     action = db.Column(db.String(50), nullable=False)  # CREATE, UPDATE, DELETE, LOGIN, etc.
     entity_type = db.Column(db.String(50))  # Component, Order, etc.
     entity_id = db.Column(db.Integer)
-    changes = db.Column(db.Text)  # JSON of what changed
+    changes_id = db.Column(db.Integer, db.ForeignKey('audit_payloads.id'), index=True)  # JSON of what changed (shared)
+    changes = db.Column(JSONDocument)  # Legacy inline JSON, for rows written before audit_payloads
     ip_address = db.Column(db.String(45))
     user_agent = db.Column(db.String(500))
-    timestamp = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    timestamp = db.Column(db.DateTime, default=utcnow(), server_default=utcnow(), index=True)
     
     user = db.relationship('User', backref='audit_logs')
+    payload = db.relationship('AuditChangePayload', lazy=True)
+    
+    __table_args__ = (
+        db.Index('ix_audit_user_time', 'user_id', 'timestamp'),
+    )
+    
+    serialize_exclude = ('changes_id', 'changes', 'user_agent')
     
     def to_dict(self):
-        return {
-            'id': self.id,
-            'user_id': self.user_id,
-            'action': self.action,
-            'entity_type': self.entity_type,
-            'entity_id': self.entity_id,
-            'changes': self.changes,
-            'ip_address': self.ip_address,
-            'timestamp': self.timestamp.isoformat() if self.timestamp else None
-        }
+        data = self.column_dict()
+        data['changes'] = self.payload.body if self.payload else self.changes
+        return data
+
+
+class AuditChangePayload(db.Model):
+    """Distinct audit 'changes' JSON bodies, stored once and shared by AuditLog rows"""
+    __tablename__ = 'audit_payloads'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    sha256 = db.Column(db.String(64), unique=True, nullable=False)  # Hex digest of canonical JSON
+    body = db.Column(JSONDocument, nullable=False)
+    
+    __table_args__ = (
+        # Containment lookups such as body @> '{"username": "admin"}'
+        db.Index('ix_audit_payload_body_gin', 'body', postgresql_using='gin').ddl_if(dialect='postgresql'),
+    )
 
 
 # ==================== MANUFACTURING ====================
 
-class Component(db.Model):
+class Component(SerializerMixin, db.Model):
     """Represents a component/part - generic parts used in horn assembly"""
     __tablename__ = 'components'
     
@@ -96,30 +347,19 @@ class Component(db.Model):
     supplier_contact = db.Column(db.String(200))
     unit_cost = db.Column(db.Float, default=0)
     minimum_order_quantity = db.Column(db.Float, default=0)  # MOQ from supplier
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=utcnow(), server_default=utcnow())
+    updated_at = db.Column(db.DateTime, default=utcnow(), server_default=utcnow(), onupdate=utcnow())
+    
+    # Relationships
+    horn_type_assignments = db.relationship('HornTypeComponent', back_populates='component', lazy=True)
+    mrp_plans = db.relationship('MRPPlan', back_populates='component', lazy=True)
+    transactions = db.relationship('InventoryTransaction', back_populates='component', lazy=True)
     
     def to_dict(self):
-        return {
-            'id': self.id,
-            'code': self.code,
-            'name': self.name,
-            'description': self.description,
-            'unit': self.unit,
-            'current_inventory': self.current_inventory,
-            'min_stock_level': self.min_stock_level,
-            'max_stock_level': self.max_stock_level,
-            'lead_time_days': self.lead_time_days,
-            'supplier_name': self.supplier_name,
-            'supplier_contact': self.supplier_contact,
-            'unit_cost': self.unit_cost,
-            'minimum_order_quantity': self.minimum_order_quantity,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None
-        }
-
-
-class HornType(db.Model):
+        return cached_to_dict(self, self.column_dict)
+
+
+class HornType(SerializerMixin, db.Model):
     """Represents a specific type of horn product (e.g., Standard Horn, Premium Horn)"""
     __tablename__ = 'horn_types'
     
@@ -127,25 +367,21 @@ class HornType(db.Model):
     code = db.Column(db.String(50), unique=True, nullable=False)
     name = db.Column(db.String(200), nullable=False)
     description = db.Column(db.Text)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=utcnow(), server_default=utcnow())
+    updated_at = db.Column(db.DateTime, default=utcnow(), server_default=utcnow(), onupdate=utcnow())
     
     # Relationships
-    bom_components = db.relationship('HornTypeComponent', backref='horn_type', lazy=True, cascade='all, delete-orphan')
-    order_line_items = db.relationship('OrderLineItem', backref='horn_type', lazy=True, cascade='all, delete-orphan')
+    bom_components = db.relationship('HornTypeComponent', back_populates='horn_type', lazy=True, cascade='all, delete-orphan')
+    order_line_items = db.relationship('OrderLineItem', back_populates='horn_type', lazy=True, cascade='all, delete-orphan')
     
     def to_dict(self):
-        return {
-            'id': self.id,
-            'code': self.code,
-            'name': self.name,
-            'description': self.description,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None
-        }
+        return cached_to_dict(self, self.column_dict)
+
 
+event.listen(Component, 'after_delete', _evict_to_dict_cache)
 
-class HornTypeComponent(db.Model):
+
+class HornTypeComponent(SerializerMixin, db.Model):
     """Links components to horn types with quantity per horn - BOM for each horn type"""
     __tablename__ = 'horn_type_components'
     
@@ -154,81 +390,107 @@ class HornTypeComponent(db.Model):
     component_id = db.Column(db.Integer, db.ForeignKey('components.id'), nullable=False)
     quantity_per_horn = db.Column(db.Float, nullable=False)  # How many units needed per horn of this type
     
-    # Relationships
-    component = db.relationship('Component', backref='horn_type_assignments', lazy=True)
+    # Relationships - component is always serialized with the BOM row, so join it in
+    horn_type = db.relationship('HornType', back_populates='bom_components')
+    component = db.relationship('Component', back_populates='horn_type_assignments', lazy='joined')
+    
+    __table_args__ = (
+        # Serves BOM lookups by horn type and allows each component once per BOM
+        db.Index('ix_htc_horn_comp', 'horn_type_id', 'component_id', unique=True),
+    )
     
     def to_dict(self):
-        return {
-            'id': self.id,
-            'horn_type_id': self.horn_type_id,
-            'component_id': self.component_id,
-            'component_code': self.component.code if self.component else None,
-            'component_name': self.component.name if self.component else None,
-            'component_unit': self.component.unit if self.component else 'pieces',
-            'quantity_per_horn': self.quantity_per_horn
-        }
-
-
-class Order(db.Model):
+        data = self.column_dict()
+        data['component_code'] = self.component.code if self.component else None
+        data['component_name'] = self.component.name if self.component else None
+        data['component_unit'] = self.component.unit if self.component else 'pieces'
+        return data
+
+
+@lru_cache(maxsize=256)
+def get_bom(horn_type_id, version):
+    """Return a horn type's BOM as ((component_id, quantity_per_horn), ...).
+    
+    version is the horn type's updated_at, which the BOM routes bump on every
+    change, so other worker processes never read a stale cached BOM.
+    """
+    return tuple(
+        db.session.query(HornTypeComponent.component_id, HornTypeComponent.quantity_per_horn)
+        .filter_by(horn_type_id=horn_type_id)
+    )
+
+
+def _clear_bom_cache(mapper, connection, target):
+    """Drop cached BOMs when a BOM row changes through the ORM"""
+    get_bom.cache_clear()
+
+for _event in ('after_insert', 'after_update', 'after_delete'):
+    event.listen(HornTypeComponent, _event, _clear_bom_cache)
+
+
+class Order(SerializerMixin, db.Model):
     """Represents a customer order - contains line items for different horn types"""
     __tablename__ = 'orders'
     
     id = db.Column(db.Integer, primary_key=True)
     order_number = db.Column(db.String(50), unique=True, nullable=False)
     customer_name = db.Column(db.String(200), nullable=False)
-    order_date = db.Column(db.DateTime, default=datetime.utcnow)
+    order_date = db.Column(db.DateTime, default=utcnow(), server_default=utcnow())
     deadline = db.Column(db.DateTime, nullable=False)
     status = db.Column(db.String(50), default='pending')  # pending, in_progress, completed, cancelled
     notes = db.Column(db.Text)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=utcnow(), server_default=utcnow())
+    updated_at = db.Column(db.DateTime, default=utcnow(), server_default=utcnow(), onupdate=utcnow())
+    # Total horns across all line items - kept in sync whenever line items change
+    total_quantity = db.Column(db.Integer, nullable=False, default=0, server_default='0')
     
     # Relationships
-    line_items = db.relationship('OrderLineItem', backref='order', lazy=True, cascade='all, delete-orphan')
-    mrp_plans = db.relationship('MRPPlan', backref='order', lazy=True, cascade='all, delete-orphan')
+    # line_items are part of every to_dict(), so load them for all fetched orders in one IN query
+    line_items = db.relationship('OrderLineItem', back_populates='order', lazy='selectin', cascade='all, delete-orphan')
+    mrp_plans = db.relationship('MRPPlan', back_populates='order', lazy=True, cascade='all, delete-orphan')
     
-    @property
-    def total_quantity(self):
-        """Total horns across all line items"""
-        return sum(item.quantity for item in self.line_items)
+    serialize_exclude = ('total_quantity',)
     
     def to_dict(self):
-        return {
-            'id': self.id,
-            'order_number': self.order_number,
-            'customer_name': self.customer_name,
-            'quantity': self.total_quantity,  # Computed for backward compatibility
-            'order_date': self.order_date.isoformat() if self.order_date else None,
-            'deadline': self.deadline.isoformat() if self.deadline else None,
-            'status': self.status,
-            'notes': self.notes,
-            'line_items': [item.to_dict() for item in self.line_items],
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None
-        }
-
-
-class OrderLineItem(db.Model):
+        data = self.column_dict()
+        data['quantity'] = self.total_quantity  # Computed for backward compatibility
+        data['line_items'] = [item.to_dict() for item in self.line_items]
+        return data
+
+
+class OrderLineItem(SerializerMixin, db.Model):
     """Order line item - specific horn type with quantity"""
     __tablename__ = 'order_line_items'
     
     id = db.Column(db.Integer, primary_key=True)
-    order_id = db.Column(db.Integer, db.ForeignKey('orders.id'), nullable=False)
+    order_id = db.Column(db.Integer, db.ForeignKey('orders.id'), nullable=False, index=True)
     horn_type_id = db.Column(db.Integer, db.ForeignKey('horn_types.id'), nullable=False)
     quantity = db.Column(db.Integer, nullable=False)
     
+    # Relationships
+    order = db.relationship('Order', back_populates='line_items')
+    horn_type = db.relationship('HornType', back_populates='order_line_items', lazy='joined')
+    
     def to_dict(self):
-        return {
-            'id': self.id,
-            'order_id': self.order_id,
-            'horn_type_id': self.horn_type_id,
-            'horn_type_code': self.horn_type.code if self.horn_type else None,
-            'horn_type_name': self.horn_type.name if self.horn_type else None,
-            'quantity': self.quantity
-        }
+        data = self.column_dict()
+        data['horn_type_code'] = self.horn_type.code if self.horn_type else None
+        data['horn_type_name'] = self.horn_type.name if self.horn_type else None
+        return data
 
 
-class ProductionConfig(db.Model):
+# SQL-side sum of an order's line items. total_quantity stores this value so
+# serializing orders is a plain column read; this deferred property is the
+# query-time expression used to (re)compute it in a single UPDATE.
+Order.line_item_total = column_property(
+    select(func.coalesce(func.sum(OrderLineItem.quantity), 0))
+    .where(OrderLineItem.order_id == Order.id)
+    .correlate_except(OrderLineItem)
+    .scalar_subquery(),
+    deferred=True
+)
+
+
+class ProductionConfig(SerializerMixin, db.Model):
     """Configuration for production capacity and constraints"""
     __tablename__ = 'production_config'
     
@@ -237,20 +499,10 @@ class ProductionConfig(db.Model):
     working_days_per_week = db.Column(db.Integer, default=6)
     max_inventory_days = db.Column(db.Integer, default=30)  # Max days of inventory to hold
     safety_stock_days = db.Column(db.Integer, default=3)  # Buffer days for safety stock
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
-    
-    def to_dict(self):
-        return {
-            'id': self.id,
-            'daily_production_capacity': self.daily_production_capacity,
-            'working_days_per_week': self.working_days_per_week,
-            'max_inventory_days': self.max_inventory_days,
-            'safety_stock_days': self.safety_stock_days,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None
-        }
+    updated_at = db.Column(db.DateTime, default=utcnow(), server_default=utcnow(), onupdate=utcnow())
 
 
-class MRPPlan(db.Model):
+class MRPPlan(SerializerMixin, db.Model):
     """Material Requirement Planning results for an order"""
     __tablename__ = 'mrp_plans'
     
@@ -265,33 +517,26 @@ class MRPPlan(db.Model):
     expected_delivery = db.Column(db.DateTime, nullable=False)  # When it should arrive
     estimated_cost = db.Column(db.Float, default=0)
     status = db.Column(db.String(50), default='planned')  # planned, ordered, received
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=utcnow(), server_default=utcnow())
     
     # Relationships
-    component = db.relationship('Component', backref='mrp_plans', lazy=True)
+    order = db.relationship('Order', back_populates='mrp_plans')
+    component = db.relationship('Component', back_populates='mrp_plans', lazy='joined')
+    
+    __table_args__ = (
+        db.Index('ix_mrp_order_date', 'order_id', 'order_date'),
+    )
     
     def to_dict(self):
-        return {
-            'id': self.id,
-            'order_id': self.order_id,
-            'component_id': self.component_id,
-            'component_code': self.component.code if self.component else None,
-            'component_name': self.component.name if self.component else None,
-            'total_required': self.total_required,
-            'current_inventory': self.current_inventory,
-            'net_requirement': self.net_requirement,
-            'order_quantity': self.order_quantity,
-            'order_date': self.order_date.isoformat() if self.order_date else None,
-            'expected_delivery': self.expected_delivery.isoformat() if self.expected_delivery else None,
-            'estimated_cost': self.estimated_cost,
-            'status': self.status,
-            'supplier_name': self.component.supplier_name if self.component else None,
-            'lead_time_days': self.component.lead_time_days if self.component else None,
-            'created_at': self.created_at.isoformat() if self.created_at else None
-        }
-
-
-class InventoryTransaction(db.Model):
+        data = self.column_dict()
+        data['component_code'] = self.component.code if self.component else None
+        data['component_name'] = self.component.name if self.component else None
+        data['supplier_name'] = self.component.supplier_name if self.component else None
+        data['lead_time_days'] = self.component.lead_time_days if self.component else None
+        return data
+
+
+class InventoryTransaction(SerializerMixin, db.Model):
     """Track inventory movements"""
     __tablename__ = 'inventory_transactions'
     
@@ -302,20 +547,16 @@ class InventoryTransaction(db.Model):
     balance_after = db.Column(db.Float, nullable=False)
     reference = db.Column(db.String(200))  # Order number, PO number, etc.
     notes = db.Column(db.Text)
-    transaction_date = db.Column(db.DateTime, default=datetime.utcnow)
+    transaction_date = db.Column(db.DateTime, default=utcnow(), server_default=utcnow())
     
     # Relationships
-    component = db.relationship('Component', backref='transactions', lazy=True)
+    component = db.relationship('Component', back_populates='transactions', lazy=True)
+    
+    __table_args__ = (
+        db.Index('ix_invtx_component_date', 'component_id', 'transaction_date'),
+    )
     
     def to_dict(self):
-        return {
-            'id': self.id,
-            'component_id': self.component_id,
-            'component_name': self.component.name if self.component else None,
-            'transaction_type': self.transaction_type,
-            'quantity': self.quantity,
-            'balance_after': self.balance_after,
-            'reference': self.reference,
-            'notes': self.notes,
-            'transaction_date': self.transaction_date.isoformat() if self.transaction_date else None
-        }
+        data = self.column_dict()
+        data['component_name'] = self.component.name if self.component else None
+        return data
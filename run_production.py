@@ -8,11 +8,22 @@ import sys
 
 os.environ['FLASK_ENV'] = 'production'
 
+GUNICORN_CONF = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'gunicorn.conf.py')
+
 if __name__ == '__main__':
-    from app import app, db
+    if sys.platform != 'win32':
+        # Read the worker settings before importing the app: for gevent workers
+        # gunicorn.conf.py monkey-patches the standard library, which must come first
+        import runpy
+        gunicorn_options = runpy.run_path(GUNICORN_CONF)
+
+    from app import app
 
-    with app.app_context():
-        db.create_all()
+    # Schema setup and migrations belong to the deploy step (python create_tables.py);
+    # set FLASK_INIT_DB=1 to run them here as well
+    if os.environ.get('FLASK_INIT_DB') == '1':
+        from create_tables import create_tables
+        create_tables()
 
     host = os.environ.get('HOST', '0.0.0.0')
     port = int(os.environ.get('PORT', 5000))
@@ -21,7 +32,12 @@ if __name__ == '__main__':
         try:
             import waitress
             print(f"Starting production server (Waitress) on http://{host}:{port}")
-            waitress.serve(app, host=host, port=port, threads=4)
+            waitress.serve(
+                app, host=host, port=port,
+                threads=int(os.environ.get('THREADS', (os.cpu_count() or 1) * 2)),
+                connection_limit=1000,
+                channel_timeout=120,
+            )
         except ImportError:
             print("Install waitress for Windows: pip install waitress")
             app.run(host=host, port=port, debug=False)
@@ -37,16 +53,15 @@ if __name__ == '__main__':
 
                 def load_config(self):
                     for key, value in self.options.items():
-                        self.cfg.set(key.lower(), value)
+                        if key.lower() in self.cfg.settings:
+                            self.cfg.set(key.lower(), value)
 
                 def load(self):
                     return self.application
 
-            StandaloneApplication(app, {
-                'bind': f'{host}:{port}',
-                'workers': int(os.environ.get('WORKERS', 4)),
-                'timeout': 120,
-            }).run()
+            # Same worker settings as `gunicorn wsgi:app`
+            gunicorn_options['bind'] = f'{host}:{port}'
+            StandaloneApplication(app, gunicorn_options).run()
         except ImportError:
             print("Install gunicorn: pip install gunicorn")
             app.run(host=host, port=port, debug=False)
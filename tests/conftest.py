@@ -0,0 +1,72 @@
+"""
+Shared fixtures: the app imported against a scratch SQLite database, so the
+API tests run with plain `pytest tests` and no server database.
+"""
+import importlib
+import os
+import sys
+import time
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LOGIN_RATE_LIMIT = '3/minute'
+
+
+def tick():
+    """Let the clock move on: updated_at, which the ETags and caches key on,
+    has millisecond resolution on SQLite"""
+    time.sleep(0.01)
+
+
+@pytest.fixture(scope='session')
+def spra(tmp_path_factory):
+    """The app module, configured (at import) for a scratch SQLite database"""
+    data_dir = tmp_path_factory.mktemp('spra')
+    overrides = {
+        'FLASK_ENV': 'development',
+        'SPRA_DATA_DIR': str(data_dir),
+        'DATABASE_URL': f'sqlite:///{(data_dir / "spra.db").as_posix()}',
+        'AUDIT_LEVEL': 'failures_only',
+        'AUDIT_SINK': 'file',
+        'LOGIN_RATE_LIMIT': LOGIN_RATE_LIMIT,
+        'RATELIMIT_STORAGE_URI': 'memory://',
+    }
+    saved = {key: os.environ.get(key) for key in overrides}
+    os.environ.update(overrides)
+    sys.path.insert(0, ROOT)
+    try:
+        app_module = importlib.import_module('app')
+    finally:
+        for key, value in saved.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+    app_module.app.config['TESTING'] = True
+    with app_module.app.app_context():
+        app_module.db.create_all()
+        admin = app_module.User(username='admin', email='admin@example.com', role='admin')
+        admin.set_password('correct-password')
+        app_module.db.session.add(admin)
+        app_module.db.session.commit()
+    return app_module
+
+
+@pytest.fixture
+def client(spra):
+    """Test client logged in as the admin user"""
+    client = spra.app.test_client()
+    with spra.app.app_context():
+        admin_id = spra.User.query.filter_by(username='admin').one().id
+    with client.session_transaction() as session:
+        session['_user_id'] = str(admin_id)
+        session['_fresh'] = True
+    return client
+
+
+def create_component(client, code, **fields):
+    """Create a component through the API and return its dict"""
+    response = client.post('/api/components', json={'code': code, 'name': code, **fields})
+    assert response.status_code == 201
+    return response.get_json()
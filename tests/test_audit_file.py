@@ -0,0 +1,55 @@
+"""
+File audit sink: daily files and their retention.
+"""
+import os
+import time
+
+
+def make_file(directory, name, age_days):
+    path = directory / name
+    path.write_text('{}\n')
+    mtime = time.time() - age_days * 86400
+    os.utime(path, (mtime, mtime))
+    return path
+
+
+def test_retention_only_removes_expired_audit_files(spra, tmp_path, monkeypatch):
+    monkeypatch.setattr(spra, 'AUDIT_RETENTION_DAYS', 30)
+    expired = make_file(tmp_path, 'audit.2000-01-01.jsonl', 40)
+    current = make_file(tmp_path, 'audit.2000-02-05.jsonl', 1)
+    unrelated = [
+        make_file(tmp_path, name, 40)
+        for name in ('audit.py', 'audit.bak', 'audit.jsonl', 'audit.x.jsonl.gz',
+                     'audit.2000-01-01.jsonl.gz', 'other.2000-01-01.jsonl')
+    ]
+
+    spra._remove_expired_audit_files(str(tmp_path), 'audit', '.jsonl')
+
+    assert not expired.exists()
+    assert current.exists()
+    assert all(path.exists() for path in unrelated)
+
+
+def test_retention_without_suffix_leaves_other_files(spra, tmp_path, monkeypatch):
+    monkeypatch.setattr(spra, 'AUDIT_RETENTION_DAYS', 30)
+    expired = make_file(tmp_path, 'audit.2000-01-01', 40)
+    unrelated = [make_file(tmp_path, name, 40) for name in ('audit.py', 'audit.2000-01-01.bak')]
+
+    spra._remove_expired_audit_files(str(tmp_path), 'audit', '')
+
+    assert not expired.exists()
+    assert all(path.exists() for path in unrelated)
+
+
+def test_batch_is_appended_to_the_daily_file(spra, tmp_path, monkeypatch):
+    monkeypatch.setattr(spra, 'AUDIT_FILE', str(tmp_path / 'audit.jsonl'))
+    monkeypatch.setattr(spra, '_audit_file', {'day': None, 'fd': None})
+    rows = [{'action': 'TEST', 'entity_id': i} for i in range(3)]
+
+    spra._write_audit_file(rows)
+    spra._write_audit_file(rows[:1])
+
+    os.close(spra._audit_file['fd'])
+    day = spra._audit_file['day'].isoformat()
+    lines = (tmp_path / f'audit.{day}.jsonl').read_text().splitlines()
+    assert [spra.app.json.loads(line)['entity_id'] for line in lines] == [0, 1, 2, 0]
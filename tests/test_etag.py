@@ -0,0 +1,43 @@
+"""
+ETag revalidation on the read-heavy endpoints.
+"""
+from conftest import create_component, tick
+
+
+def test_components_etag_revalidation(client):
+    create_component(client, 'ETAG-1')
+
+    first = client.get('/api/components')
+    assert first.status_code == 200
+    assert first.headers['Cache-Control'] == 'private, no-cache'
+    etag = first.headers['ETag']
+
+    unchanged = client.get('/api/components', headers={'If-None-Match': etag})
+    assert unchanged.status_code == 304
+    assert unchanged.data == b''
+
+    tick()
+    component = create_component(client, 'ETAG-2')
+    after_create = client.get('/api/components', headers={'If-None-Match': etag})
+    assert after_create.status_code == 200
+    etag = after_create.headers['ETag']
+
+    tick()
+    client.put(f"/api/components/{component['id']}", json={'name': 'Renamed'})
+    after_update = client.get('/api/components', headers={'If-None-Match': etag})
+    assert after_update.status_code == 200
+    assert after_update.headers['ETag'] != etag
+    assert 'Renamed' in {c['name'] for c in after_update.get_json()}
+
+
+def test_production_config_etag_revalidation(client):
+    first = client.get('/api/production-config')
+    assert first.status_code == 200
+    etag = first.headers['ETag']
+    assert client.get('/api/production-config', headers={'If-None-Match': etag}).status_code == 304
+
+    tick()
+    client.put('/api/production-config', json={'daily_production_capacity': 1234})
+    changed = client.get('/api/production-config', headers={'If-None-Match': etag})
+    assert changed.status_code == 200
+    assert changed.get_json()['daily_production_capacity'] == 1234
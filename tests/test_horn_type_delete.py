@@ -0,0 +1,32 @@
+"""
+Horn type deletes, which run as query-level deletes.
+"""
+from datetime import datetime, timedelta
+
+
+def test_delete_horn_type_recalculates_order_totals(spra, client):
+    import models  # importable once the spra fixture has set up the app
+
+    with spra.app.app_context():
+        kept = spra.HornType(code='DEL-KEEP', name='Kept')
+        deleted = spra.HornType(code='DEL-GONE', name='Deleted')
+        order = spra.Order(order_number='DEL-ORDER', customer_name='Customer',
+                           deadline=datetime.utcnow() + timedelta(days=30))
+        spra.db.session.add_all([kept, deleted, order])
+        spra.db.session.flush()
+        spra.db.session.add_all([
+            spra.OrderLineItem(order_id=order.id, horn_type_id=kept.id, quantity=100),
+            spra.OrderLineItem(order_id=order.id, horn_type_id=deleted.id, quantity=50),
+        ])
+        order.total_quantity = 150
+        spra.db.session.commit()
+        order_id, deleted_id = order.id, deleted.id
+        deleted.to_dict()  # cache its serialized form
+
+    assert client.delete(f'/api/horn-types/{deleted_id}').status_code == 200
+    assert client.delete(f'/api/horn-types/{deleted_id}').status_code == 404
+
+    with spra.app.app_context():
+        assert spra.db.session.get(spra.Order, order_id).total_quantity == 100
+        assert spra.db.session.get(spra.HornType, deleted_id) is None
+    assert not [key for key in models._to_dict_cache if key[:2] == ('horn_types', deleted_id)]
@@ -0,0 +1,23 @@
+"""
+Login rate limiting.
+"""
+from conftest import LOGIN_RATE_LIMIT
+
+
+def test_login_rate_limit(spra):
+    client = spra.app.test_client()
+    limit = int(LOGIN_RATE_LIMIT.split('/')[0])
+    environ = {'REMOTE_ADDR': '203.0.113.7'}
+    for _ in range(limit):
+        response = client.post('/login', json={'username': 'admin', 'password': 'wrong'},
+                               environ_base=environ)
+        assert response.status_code == 401
+
+    response = client.post('/login', json={'username': 'admin', 'password': 'correct-password'},
+                           environ_base=environ)
+    assert response.status_code == 429
+
+    # The limit is per client address
+    other = client.post('/login', json={'username': 'admin', 'password': 'correct-password'},
+                        environ_base={'REMOTE_ADDR': '203.0.113.8'})
+    assert other.status_code == 200
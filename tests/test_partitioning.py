@@ -0,0 +1,155 @@
+"""
+create_tables.py turning the baseline audit_logs / inventory_transactions
+tables into monthly partitioned ones on PostgreSQL.
+Needs a scratch database (its public schema is dropped):
+TEST_DATABASE_URL=postgresql://... pytest tests
+"""
+import os
+import subprocess
+import sys
+import textwrap
+from datetime import date, datetime, timedelta
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TEST_DATABASE_URL = os.environ.get('TEST_DATABASE_URL')
+AUDIT_RETENTION_DAYS = 90
+
+pytestmark = pytest.mark.skipif(not TEST_DATABASE_URL, reason='TEST_DATABASE_URL not set')
+
+# audit_logs and inventory_transactions as the first release created them
+BASELINE_TABLES = '''
+CREATE TABLE audit_logs (
+    id SERIAL PRIMARY KEY,
+    user_id INTEGER REFERENCES users (id),
+    action VARCHAR(50) NOT NULL,
+    entity_type VARCHAR(50),
+    entity_id INTEGER,
+    changes TEXT,
+    ip_address VARCHAR(45),
+    user_agent VARCHAR(500),
+    timestamp TIMESTAMP WITHOUT TIME ZONE
+);
+CREATE INDEX ix_audit_logs_timestamp ON audit_logs (timestamp);
+CREATE TABLE inventory_transactions (
+    id SERIAL PRIMARY KEY,
+    component_id INTEGER NOT NULL REFERENCES components (id),
+    transaction_type VARCHAR(50) NOT NULL,
+    quantity FLOAT NOT NULL,
+    balance_after FLOAT NOT NULL,
+    reference VARCHAR(200),
+    notes TEXT,
+    transaction_date TIMESTAMP WITHOUT TIME ZONE
+);
+'''
+
+
+def add_months(month, count):
+    years, month_index = divmod(month.month - 1 + count, 12)
+    return date(month.year + years, month_index + 1, 1)
+
+
+def run(args, code=None):
+    """Run a script (or code, with the app imported) against the test database"""
+    if code is not None:
+        args = ['-c', 'from app import app, db\n' + textwrap.dedent(code)]
+    result = subprocess.run(
+        [sys.executable, *args], cwd=ROOT, capture_output=True, text=True, timeout=300,
+        env={**os.environ, 'DATABASE_URL': TEST_DATABASE_URL, 'FLASK_ENV': 'production',
+             'AUDIT_RETENTION_DAYS': str(AUDIT_RETENTION_DAYS)},
+    )
+    assert result.returncode == 0, result.stdout + result.stderr
+    return result.stdout
+
+
+@pytest.fixture
+def db():
+    sqlalchemy = pytest.importorskip('sqlalchemy')
+    engine = sqlalchemy.create_engine(TEST_DATABASE_URL.replace('postgres://', 'postgresql://', 1))
+    yield engine, sqlalchemy.text
+    engine.dispose()
+
+
+def test_create_tables_partitions_baseline_tables(db):
+    engine, text = db
+    with engine.begin() as conn:
+        conn.execute(text('DROP SCHEMA public CASCADE'))
+        conn.execute(text('CREATE SCHEMA public'))
+    # Every other table in its current form, then the two tables as released
+    run([], '''
+        partitioned = {'audit_logs', 'inventory_transactions'}
+        with app.app_context():
+            db.metadata.create_all(db.engine, tables=[
+                table for table in db.metadata.sorted_tables if table.name not in partitioned
+            ])
+    ''')
+
+    now = datetime.utcnow().replace(microsecond=0)
+    old = now - timedelta(days=400)  # Older than AUDIT_RETENTION_DAYS
+    this_month = date.today().replace(day=1)
+    with engine.begin() as conn:
+        conn.execute(text(BASELINE_TABLES))
+        component_id = conn.execute(text(
+            "INSERT INTO components (code, name) VALUES ('PART-1', 'Part') RETURNING id"
+        )).scalar()
+        audit_ids = [
+            conn.execute(text(
+                "INSERT INTO audit_logs (action, changes, timestamp) VALUES (:action, :changes, :ts) RETURNING id"
+            ), {'action': action, 'changes': '{"n": 1}', 'ts': ts}).scalar()
+            for action, ts in [('OLD', old)] * 3 + [('CURRENT', now)] * 5 + [('UNDATED', None)]
+        ]
+        inventory_ids = [
+            conn.execute(text(
+                "INSERT INTO inventory_transactions "
+                "(component_id, transaction_type, quantity, balance_after, transaction_date) "
+                "VALUES (:component_id, 'receipt', 1, 1, :ts) RETURNING id"
+            ), {'component_id': component_id, 'ts': ts}).scalar()
+            for ts in [old] * 2 + [now] * 3
+        ]
+
+    run(['create_tables.py'])
+
+    # A missed monthly run: the furthest month's partition is missing when its
+    # rows arrive, so they land in the default partition
+    last_month = add_months(this_month, 3)
+    last_partition = f'audit_logs_{last_month:%Y_%m}'
+    with engine.begin() as conn:
+        conn.execute(text(f'DROP TABLE {last_partition}'))
+        audit_ids.append(conn.execute(text(
+            "INSERT INTO audit_logs (action, timestamp) VALUES ('MISSED_RUN', :ts) RETURNING id"
+        ), {'ts': datetime.combine(last_month.replace(day=15), datetime.min.time())}).scalar())
+        assert conn.execute(text('SELECT COUNT(*) FROM audit_logs_default')).scalar() == 1
+
+    run(['create_tables.py'])  # Must be safe to re-run
+
+    with engine.begin() as conn:
+        def scalar(sql, **params):
+            return conn.execute(text(sql), params).scalar()
+
+        for table in ('audit_logs', 'inventory_transactions'):
+            assert scalar("SELECT relkind FROM pg_class WHERE oid = to_regclass(:t)", t=table) == 'p'
+            assert scalar("SELECT to_regclass(:t)", t=f'{table}_legacy') is None
+            assert scalar("SELECT to_regclass(:t)", t=f'{table}_default') is not None
+            for month in range(4):
+                partition = f'{table}_{add_months(this_month, month):%Y_%m}'
+                assert scalar("SELECT to_regclass(:t)", t=partition) is not None, partition
+            assert scalar(f'SELECT COUNT(*) FROM {table}_default') == 0
+            assert scalar("SELECT pg_get_serial_sequence(:t, 'id')", t=table) is not None
+
+        # Expired audit months are dropped whole; inventory history is kept
+        assert scalar("SELECT to_regclass(:t)", t=f'audit_logs_{old:%Y_%m}') is None
+        assert scalar("SELECT to_regclass(:t)", t=f'inventory_transactions_{old:%Y_%m}') is not None
+        assert scalar("SELECT COUNT(*) FROM audit_logs WHERE action = 'OLD'") == 0
+        assert scalar("SELECT COUNT(*) FROM audit_logs WHERE action IN ('CURRENT', 'UNDATED')") == 6
+        assert scalar("SELECT COUNT(*) FROM audit_logs WHERE timestamp IS NULL") == 0
+        assert scalar(f"SELECT COUNT(*) FROM {last_partition} WHERE action = 'MISSED_RUN'") == 1
+        assert scalar('SELECT COUNT(*) FROM inventory_transactions') == len(inventory_ids)
+        assert sorted(conn.execute(text('SELECT id FROM inventory_transactions')).scalars()) == inventory_ids
+
+        # The id sequences carry on from the legacy tables
+        assert scalar("INSERT INTO audit_logs (action) VALUES ('AFTER') RETURNING id") == max(audit_ids) + 1
+        assert scalar(
+            "INSERT INTO inventory_transactions (component_id, transaction_type, quantity, balance_after) "
+            "VALUES (:c, 'receipt', 1, 1) RETURNING id", c=component_id
+        ) == max(inventory_ids) + 1
@@ -0,0 +1,17 @@
+"""
+Per-process ProductionConfig cache.
+"""
+from conftest import tick
+
+
+def test_cached_production_config_sees_updates_from_other_processes(spra, client):
+    client.get('/api/production-config')  # make sure the row exists
+    with spra.app.app_context():
+        assert spra.get_cached_production_config() is not None
+        # Another worker process updates the row behind this one's cache
+        tick()
+        config = spra.ProductionConfig.query.first()
+        config.safety_stock_days = 9
+        config.updated_at = spra.utcnow()
+        spra.db.session.commit()
+        assert spra.get_cached_production_config()['safety_stock_days'] == 9
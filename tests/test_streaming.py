@@ -0,0 +1,58 @@
+"""
+Streamed JSON list responses.
+"""
+import json
+
+import pytest
+
+
+class Row:
+    def __init__(self, n):
+        self.n = n
+
+    def to_dict(self):
+        if self.n == 'boom':
+            raise RuntimeError('serialization failed')
+        return {'n': self.n}
+
+
+class FakeQuery:
+    """Stands in for a Query: yield_per returns the given rows"""
+    def __init__(self, rows):
+        self.rows = rows
+
+    def yield_per(self, count):
+        return iter(self.rows)
+
+
+def stream(spra, rows, batch_size=2):
+    with spra.app.test_request_context('/api/test'):
+        response = spra.stream_json_list(FakeQuery(rows), batch_size=batch_size)
+        return ''.join(response.response)
+
+
+def test_streams_a_valid_array(spra):
+    for count in (0, 1, 2, 5):
+        body = stream(spra, [Row(n) for n in range(count)])
+        assert json.loads(body) == [{'n': n} for n in range(count)]
+
+
+def test_failure_in_first_batch_raises_before_the_response_starts(spra):
+    with spra.app.test_request_context('/api/test'):
+        with pytest.raises(RuntimeError):
+            spra.stream_json_list(FakeQuery([Row(0), Row('boom')]), batch_size=2)
+
+
+def test_failure_mid_stream_is_logged_and_leaves_invalid_json(spra, caplog):
+    with spra.app.test_request_context('/api/test'):
+        response = spra.stream_json_list(FakeQuery([Row(0), Row(1), Row(2), Row('boom')]), batch_size=2)
+        sent = []
+        with pytest.raises(RuntimeError):
+            for part in response.response:
+                sent.append(part)
+    body = ''.join(sent)
+    assert body.startswith('[')
+    assert not body.endswith(']')
+    with pytest.raises(ValueError):
+        json.loads(body)
+    assert 'failed mid-response' in caplog.text
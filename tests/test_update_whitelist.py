@@ -0,0 +1,38 @@
+"""
+PUT handlers only apply whitelisted fields.
+"""
+from conftest import create_component
+
+
+def test_update_component_ignores_fields_outside_whitelist(client):
+    component = create_component(client, 'WL-1', unit_cost=2.5)
+
+    response = client.put(f"/api/components/{component['id']}", json={
+        'id': component['id'] + 1000,
+        'created_at': '2000-01-01T00:00:00',
+        'horn_type_assignments': [],
+        'name': ' Whitelisted ',
+        'unit_cost': 4.0,
+    })
+    assert response.status_code == 200
+    updated = response.get_json()
+    assert updated['id'] == component['id']
+    assert updated['created_at'] == component['created_at']
+    assert updated['name'] == 'Whitelisted'
+    assert updated['unit_cost'] == 4.0
+
+
+def test_update_horn_type_ignores_fields_outside_whitelist(client):
+    created = client.post('/api/horn-types', json={'code': 'WL-HT', 'name': 'Horn'}).get_json()
+
+    response = client.put(f"/api/horn-types/{created['id']}", json={
+        'id': created['id'] + 1000,
+        'created_at': '2000-01-01T00:00:00',
+        'bom_components': [],
+        'name': 'Renamed horn',
+    })
+    assert response.status_code == 200
+    updated = response.get_json()
+    assert updated['id'] == created['id']
+    assert updated['created_at'] == created['created_at']
+    assert updated['name'] == 'Renamed horn'
@@ -0,0 +1,7 @@
+"""
+WSGI entry point for production servers.
+Usage: gunicorn wsgi:app   (settings are read from gunicorn.conf.py)
+"""
+from app import app
+
+application = app